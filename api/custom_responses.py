@@ -4,8 +4,24 @@ Custom response classes for high-performance serialization.
 from typing import Any
 
 import orjson # type: ignore
+from bson import Decimal128, ObjectId # type: ignore
 from fastapi.responses import JSONResponse # type: ignore
 
+# MongoDB documents never contain numpy types, so OPT_SERIALIZE_NUMPY is not set
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def orjson_default(obj: Any) -> Any:
+    """
+    Fallback for the BSON types orjson cannot serialize natively. ObjectIds
+    and Decimal128 values are stringified inline while orjson walks the
+    document tree, so callers never need a separate Python-level pass over
+    the results.
+    """
+    if isinstance(obj, (ObjectId, Decimal128)):
+        return str(obj)
+    raise TypeError
+
 
 class ORJSONResponse(JSONResponse):
     """
@@ -18,5 +34,6 @@ class ORJSONResponse(JSONResponse):
     def render(self, content: Any) -> bytes:
         return orjson.dumps(
             content, 
-            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+            option=ORJSON_OPTIONS,
+            default=orjson_default
         )
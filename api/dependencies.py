@@ -4,11 +4,14 @@ API Dependencies
 This file contains reusable dependencies used across multiple API endpoints,
 primarily for handling authentication and resource injection (like database clients).
 """
+from typing import Any, Dict
+
 from fastapi import Depends, HTTPException, status, Request # type: ignore
 from fastapi.security import OAuth2PasswordBearer # type: ignore
 
-from core.db import get_data_client, get_userdb_client, get_redis_client
-from models.pydantic_models import TokenData
+from models.data_models import TokenData
+from services.authn import Auth
+from services.query_router import QueryRouter
 
 # This scheme is still useful for API documentation and client-side integrations,
 # but our new get_current_user dependency won't use it directly to get the token.
@@ -32,8 +35,9 @@ async def get_current_user(request: Request) -> TokenData:
     Raises:
         HTTPException: with status 401 if authentication fails.
     """
-    if hasattr(request.state, "user") and request.state.user:
-        return request.state.user
+    user = request.state.user
+    if user is not None:
+        return user
     
     # If the middleware did not find a valid user, reject the request.
     raise HTTPException(
@@ -42,3 +46,44 @@ async def get_current_user(request: Request) -> TokenData:
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+async def get_current_user_dump(request: Request) -> Dict[str, Any]:
+    """
+    Dependency to get the current user's decoded token payload as a dict.
+
+    Parallels `get_current_user`, but returns the payload that
+    AuthContextMiddleware already decoded, so endpoints that need a plain
+    dict (e.g. the QueryRouter's `info` field) don't re-dump the model.
+
+    Raises:
+        HTTPException: with status 401 if authentication fails.
+    """
+    user_dump = request.state.user_dump
+    if user_dump is not None:
+        return user_dump
+
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_query_router(request: Request) -> QueryRouter:
+    """
+    Dependency to get the application-wide QueryRouter.
+
+    The router is built once during application startup and holds no
+    per-request state, so every endpoint shares the same instance.
+    """
+    return request.app.state.query_router
+
+
+def get_auth_service(request: Request) -> Auth:
+    """
+    Dependency to get the application-wide Auth service.
+
+    Like the QueryRouter, it is built once during application startup so
+    that its in-process caches are shared across requests.
+    """
+    return request.app.state.auth_service
@@ -1,15 +1,18 @@
 """
 API router for authentication and user management.
 """
+from typing import Any, Dict
+
 from fastapi import APIRouter, Depends, HTTPException, status, Request # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
 from fastapi.security import OAuth2PasswordRequestForm # type: ignore
-from pymongo import MongoClient # type: ignore
-from redis import Redis # type: ignore
 
-from api.dependencies import get_current_user, get_userdb_client, get_data_client, get_redis_client # type: ignore
-from models.pydantic_models import (Token, TokenData, UserCreate,
-                                    UserCreateResponse, UserUpdate, StatusResponse, UserMeResponse)
-from services.authn import Auth
+from api.custom_responses import ORJSONResponse
+from api.dependencies import get_auth_service, get_current_user, get_current_user_dump, get_query_router # type: ignore
+from models.data_models import TokenData
+from models.request_models import UserCreate, UserUpdate
+from models.response_models import Token, UserCreateResponse, StatusResponse, UserMeResponse
+from services.authn import PERM_USER_MGMT, Auth
 from services.exceptions import (AuthenticationError, DatabaseError,
                                  DocumentNotFoundError, DuplicateUserError, PolicyNotFoundError)
 from services.query_router import QueryRouter
@@ -21,8 +24,7 @@ router = APIRouter(tags=["Authentication & Users"])
 @router.post("/auth/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    redis_client: Redis = Depends(get_redis_client),
+    auth_service: Auth = Depends(get_auth_service),
 ):
     """
     Logs in a user to get an access token.
@@ -31,11 +33,10 @@ async def login_for_access_token(
     In our case, 'password' corresponds to the user's API key.
     """
     try:
-        auth_service = Auth(r=redis_client, client=userdb_client)
-        access_token = auth_service.authenticate_user(
-            user_id=form_data.username, api_key=form_data.password
+        access_token = await run_in_threadpool(
+            auth_service.authenticate_user, user_id=form_data.username, api_key=form_data.password
         )
-        return {"access_token": access_token, "token_type": "bearer", "status_code": 200}
+        return ORJSONResponse(content={"access_token": access_token, "token_type": "bearer", "status_code": 200})
     except AuthenticationError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,7 +54,7 @@ async def read_users_me(request: Request, current_user: TokenData = Depends(get_
     A simple protected endpoint to verify that the 'get_current_user'
     dependency is working correctly.
     """
-    return UserMeResponse(**current_user.model_dump(), status_code=200)
+    return ORJSONResponse(content={**current_user.model_dump(exclude={"perm_flags"}), "status_code": 200})
 
 
 @router.post("/users", response_model=UserCreateResponse, status_code=status.HTTP_201_CREATED)
@@ -62,16 +63,15 @@ async def create_new_user(
     request: Request,
     user_to_create: UserCreate,
     current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Creates a new user. This is a protected endpoint requiring
     'user_management' permissions.
     """
     # Authorization: Check if the current user has permission to create users.
-    if not current_user.permissions.get("user_management"):
+    if not current_user.perm_flags & PERM_USER_MGMT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to create new users.",
@@ -80,7 +80,7 @@ async def create_new_user(
     # Prepare the payload for the query router service
     payload = {
         "op": "create_user",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "request": {
             "user_id": user_to_create.user_id,
             "policy": user_to_create.policy,
@@ -88,21 +88,19 @@ async def create_new_user(
                 "name": user_to_create.name,
                 "department": user_to_create.department,
             },
-            "perm": {
-                "read": user_to_create.read_permissions,
-                "write": user_to_create.write_permissions,
-            },
+            # by_alias gives the {"read": ..., "write": ...} shape with Permissions unwrapped
+            "perm": user_to_create.model_dump(
+                include={"read_permissions", "write_permissions"}, by_alias=True
+            ),
         },
     }
 
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        api_key = query_router.route_query(request, payload)
+        api_key = await run_in_threadpool(query_router.route_query, request, payload)
         
-        return UserCreateResponse(
-            user_id=user_to_create.user_id,
-            api_key=api_key
-        )
+        # Trusted: user_id was validated by UserCreate and the API key was generated server-side
+        response = UserCreateResponse.model_construct(user_id=user_to_create.user_id, api_key=api_key)
+        return ORJSONResponse(status_code=status.HTTP_201_CREATED, content=response.model_dump())
     except DuplicateUserError as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except PolicyNotFoundError as e:
@@ -118,15 +116,14 @@ async def update_existing_user(
     user_id_to_update: str,
     user_updates: UserUpdate,
     current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Updates a user's policy and/or permissions. This is a protected
     endpoint requiring 'user_management' permissions.
     """
-    if not current_user.permissions.get("user_management"):
+    if not current_user.perm_flags & PERM_USER_MGMT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to update users.",
@@ -134,18 +131,19 @@ async def update_existing_user(
 
     payload = {
         "op": "update_user",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "request": {
             "user_id": user_id_to_update,
             "policy": user_updates.policy,
-            "permissions": user_updates.permissions,
+            "permissions": user_updates.model_dump(include={"permissions"})["permissions"],
         },
     }
 
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        query_router.route_query(request, payload)
-        return StatusResponse(message=f"User '{user_id_to_update}' updated successfully.")
+        await run_in_threadpool(query_router.route_query, request, payload)
+        # Trusted: server-built message
+        response = StatusResponse.model_construct(message=f"User '{user_id_to_update}' updated successfully.")
+        return ORJSONResponse(content=response.model_dump())
     except DocumentNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except (DatabaseError, ValueError) as e:
@@ -158,9 +156,8 @@ async def delete_existing_user(
     request: Request,
     user_id_to_delete: str,
     current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Deletes a user. This is a protected endpoint requiring
@@ -172,7 +169,7 @@ async def delete_existing_user(
             detail="Admins cannot delete themselves.",
         )
     
-    if not current_user.permissions.get("user_management"):
+    if not current_user.perm_flags & PERM_USER_MGMT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to delete users.",
@@ -180,14 +177,15 @@ async def delete_existing_user(
 
     payload = {
         "op": "delete_user",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "request": {"user_id": user_id_to_delete},
     }
 
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        query_router.route_query(request, payload)
-        return StatusResponse(message="User deleted successfully.")
+        await run_in_threadpool(query_router.route_query, request, payload)
+        # Trusted: server-built message
+        response = StatusResponse.model_construct(message="User deleted successfully.")
+        return ORJSONResponse(content=response.model_dump())
     except DocumentNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except (DatabaseError, ValueError) as e:
@@ -1,53 +1,81 @@
 """
 API router for generic data CRUD operations.
 """
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
 
+import orjson # type: ignore
 from fastapi import APIRouter, Depends, HTTPException, status, Request # type: ignore
-from pymongo import MongoClient # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
 from pymongo.errors import PyMongoError # type: ignore
+from starlette.responses import Response, StreamingResponse # type: ignore
 
-from redis import Redis # type: ignore
-from api.dependencies import (get_current_user,
-                              get_userdb_client, # type: ignore
-                              get_data_client,  # type: ignore
-                              get_redis_client) # type: ignore
-from api.custom_responses import ORJSONResponse
-from models.pydantic_models import CountResponse, DataQuery, DataUpdate, StatusResponse, TokenData
+from api.dependencies import get_current_user_dump, get_query_router
+from api.custom_responses import ORJSON_OPTIONS, orjson_default
+from models.request_models import DataBulkWrite, DataQuery, DataUpdate
+from models.response_models import BulkWriteResponse, CountResponse, StatusResponse
 from services.exceptions import (AuthorizationError, DatabaseError,
-                                 DocumentNotFoundError)
+                                 DocumentNotFoundError, PageTooLargeError)
 from services.query_router import QueryRouter
 
 router = APIRouter(prefix="/data", tags=["Data Operations"])
 
+# Streamed bodies are flushed in chunks of about this size rather than per document,
+# since Starlette hops to the threadpool for every item of a sync iterator
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _json_response(content: Dict[str, Any], status_code: int = 200) -> Response:
+    """
+    Serializes the content once with orjson and returns it as a bare Response,
+    so FastAPI performs no further encoding or response-model validation.
+    """
+    body = orjson.dumps(content, option=ORJSON_OPTIONS, default=orjson_default)
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+def _stream_documents(first: Optional[Dict[str, Any]], documents: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Encodes `{"status_code": 200, "data": [...]}` incrementally, pulling documents
+    from the cursor as the response is sent. `first` is the already-fetched first
+    document (None for no results), so query errors surface before the headers.
+    """
+    chunk = bytearray(b'{"status_code":200,"data":[')
+    if first is not None:
+        chunk += orjson.dumps(first, option=ORJSON_OPTIONS, default=orjson_default)
+        for document in documents:
+            chunk += b","
+            chunk += orjson.dumps(document, option=ORJSON_OPTIONS, default=orjson_default)
+            if len(chunk) >= _STREAM_CHUNK_BYTES:
+                yield bytes(chunk)
+                chunk.clear()
+    chunk += b"]}"
+    yield bytes(chunk)
+
 
 @router.post("/find_one")
 async def find_one_document(
     request: Request,
     request_data: DataQuery,
-    current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Fetches a single document from a specified collection.
     """
     payload = {
         "op": "find_one",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "db": request_data.db,
         "coll": request_data.collection,
-        "request": {"query": request_data.query, "projection": request_data.projection},
+        "request": {
+            "query": request_data.query,
+            "projection": request_data.projection,
+            "fields": request_data.fields,
+        },
     }
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        document = query_router.route_query(request, payload)
-
-        if '_id' in document.keys():
-            document['_id'] = str(document['_id'])
-            
-        return ORJSONResponse(content={"status_code": 200, "data": document})
+        document = await run_in_threadpool(query_router.route_query, request, payload)
+        return _json_response({"status_code": 200, "data": document})
     except DocumentNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except AuthorizationError as e:
@@ -60,22 +88,22 @@ async def find_one_document(
 async def find_documents(
     request: Request,
     request_data: DataQuery,
-    current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Fetches a list of documents from a specified collection based on a query.
+    The documents are streamed from the cursor, so the full result is never held in memory.
     """
     payload = {
         "op": "find",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "db": request_data.db,
         "coll": request_data.collection,
         "request": {
             "query": request_data.query,
             "projection": request_data.projection,
+            "fields": request_data.fields,
             "sort": request_data.sort,
             "limit": request_data.limit,
             "offset": request_data.offset,
@@ -83,14 +111,49 @@ async def find_documents(
         },
     }
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        documents = query_router.route_query(request, payload)
-        
-        for doc in documents:
-            if "_id" in doc.keys():
-                doc["_id"] = str(doc["_id"])
-        
-        return ORJSONResponse(content={"status_code": 200, "data": documents})
+        documents = await run_in_threadpool(query_router.route_query, request, payload)
+        # Runs the query now, so errors are still reported with a proper status code
+        first = await run_in_threadpool(next, documents, None)
+        return StreamingResponse(_stream_documents(first, documents), media_type="application/json")
+    except AuthorizationError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except (DatabaseError, ValueError, PyMongoError) as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/find_page")
+async def find_page_of_documents(
+    request: Request,
+    request_data: DataQuery,
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
+):
+    """
+    Fetches one page of documents (`offset`/`limit`) and the total number of
+    matching documents, in a single database command.
+    `limit` is required; pages are sorted by `_id` unless `sort` is given.
+    """
+    if request_data.limit is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="find_page requires a limit.")
+    payload = {
+        "op": "find_page",
+        "info": user_info,
+        "db": request_data.db,
+        "coll": request_data.collection,
+        "request": {
+            "query": request_data.query,
+            "projection": request_data.projection,
+            "fields": request_data.fields,
+            "sort": request_data.sort,
+            "limit": request_data.limit,
+            "offset": request_data.offset,
+        },
+    }
+    try:
+        page = await run_in_threadpool(query_router.route_query, request, payload)
+        return _json_response({"status_code": 200, "data": page["data"], "total": page["total"]})
+    except PageTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except AuthorizationError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except (DatabaseError, ValueError, PyMongoError) as e:
@@ -101,25 +164,22 @@ async def find_documents(
 async def count_documents(
     request: Request,
     request_data: DataQuery,
-    current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Counts the number of documents matching the query.
     """
     payload = {
         "op": "count_documents",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "db": request_data.db,
         "coll": request_data.collection,
         "request": {"query": request_data.query},
     }
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        document_count = query_router.route_query(request, payload)
-        return CountResponse(count=document_count)
+        document_count = await run_in_threadpool(query_router.route_query, request, payload)
+        return _json_response({"count": document_count, "status_code": 200})
     except AuthorizationError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except (DatabaseError, ValueError, PyMongoError) as e:
@@ -130,10 +190,8 @@ async def count_documents(
 async def insert_one_document(
     request: Request,
     request_data: DataQuery,
-    current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Inserts a single document into a specified collection.
@@ -142,15 +200,14 @@ async def insert_one_document(
     """
     payload = {
         "op": "insert_one",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "db": request_data.db,
         "coll": request_data.collection,
         "request": {"document": request_data.query},
     }
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        query_router.route_query(request, payload)
-        return StatusResponse(message="Document inserted successfully.")
+        await run_in_threadpool(query_router.route_query, request, payload)
+        return _json_response({"status": "ok", "status_code": 200, "message": "Document inserted successfully."})
     except AuthorizationError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except (DatabaseError, ValueError, PyMongoError) as e:
@@ -161,25 +218,22 @@ async def insert_one_document(
 async def update_one_document(
     request: Request,
     request_data: DataUpdate,
-    current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Updates a single document in a specified collection.
     """
     payload = {
         "op": "update_one",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "db": request_data.db,
         "coll": request_data.collection,
         "request": {"query": request_data.query, "op": request_data.update},
     }
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        query_router.route_query(request, payload)
-        return StatusResponse(message="Document updated successfully.")
+        await run_in_threadpool(query_router.route_query, request, payload)
+        return _json_response({"status": "ok", "status_code": 200, "message": "Document updated successfully."})
     except DocumentNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except AuthorizationError as e:
@@ -192,28 +246,54 @@ async def update_one_document(
 async def delete_one_document(
     request: Request,
     request_data: DataQuery,
-    current_user: TokenData = Depends(get_current_user),
-    userdb_client: MongoClient = Depends(get_userdb_client),
-    data_client: MongoClient = Depends(get_data_client),
-    redis_client: Redis = Depends(get_redis_client),
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
 ):
     """
     Deletes a single document from a specified collection.
     """
     payload = {
         "op": "delete_one",
-        "info": current_user.model_dump(),
+        "info": user_info,
         "db": request_data.db,
         "coll": request_data.collection,
         "request": {"query": request_data.query},
     }
     try:
-        query_router = QueryRouter(userdb_client=userdb_client, data_client=data_client, redis_client=redis_client)
-        query_router.route_query(request, payload)
-        return StatusResponse(message="Document deleted successfully.")
+        await run_in_threadpool(query_router.route_query, request, payload)
+        return _json_response({"status": "ok", "status_code": 200, "message": "Document deleted successfully."})
     except DocumentNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except AuthorizationError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
     except (DatabaseError, ValueError, PyMongoError) as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/bulk_write", response_model=BulkWriteResponse)
+async def bulk_write_documents(
+    request: Request,
+    request_data: DataBulkWrite,
+    user_info: Dict[str, Any] = Depends(get_current_user_dump),
+    query_router: QueryRouter = Depends(get_query_router),
+):
+    """
+    Performs several inserts, updates and deletes on a collection in one round trip.
+    Operations are unordered: a failing write doesn't stop the others. If any
+    failed, the response is a 207 listing them in `write_errors`.
+    """
+    payload = {
+        "op": "bulk_write",
+        "info": user_info,
+        "db": request_data.db,
+        "coll": request_data.collection,
+        "request": {"ops": [op.model_dump() for op in request_data.operations]},
+    }
+    try:
+        counts = await run_in_threadpool(query_router.route_query, request, payload)
+        code = status.HTTP_207_MULTI_STATUS if counts.get("write_errors") else status.HTTP_200_OK
+        return _json_response({**counts, "status_code": code}, status_code=code)
+    except AuthorizationError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except (DatabaseError, ValueError, PyMongoError) as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -16,6 +16,31 @@ class Settings(BaseSettings):
     DATA_MONGO_URI: str
     REDIS_URL: str
     SERVER_SECRET: str
+    # Key for hashing API keys, kept separate from SERVER_SECRET so the JWT secret
+    # can be rotated without invalidating API keys. Changing it invalidates every
+    # API key issued under the old value.
+    API_KEY_PEPPER: str
+
+    # Connection pool tuning for the Mongo and Redis clients
+    MONGO_MAX_POOL_SIZE: int = 200
+    MONGO_MIN_POOL_SIZE: int = 20
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 500
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 2000
+    MONGO_SOCKET_TIMEOUT_MS: int = 10_000
+    MONGO_MAX_IDLE_TIME_MS: int = 30_000
+    MONGO_COMPRESSORS: str = "zstd,snappy"
+    REDIS_MAX_CONNECTIONS: int = 200
+
+    # Worker threads for blocking PyMongo/Redis calls; matches the Mongo pool size
+    THREADPOOL_SIZE: int = 200
+
+    # Optional in-process cache of verified JWT payloads
+    JWT_CACHE_ENABLED: bool = False
+    JWT_CACHE_TTL_SECONDS: int = 60
+    JWT_CACHE_MAXSIZE: int = 10_000
+
+    # Request bodies larger than this are not captured in usage logs
+    LOG_BODY_MAX_BYTES: int = 16 * 1024
 
     # Pydantic v2 uses a model_config dictionary instead of a class Config
     model_config = ConfigDict(
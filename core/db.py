@@ -12,15 +12,45 @@ class DB:
     redis_client: redis.Redis | None = None
 
 
+def make_mongo_client(uri: str) -> MongoClient:
+    """
+    Creates a MongoClient with explicit pool, timeout and wire-compression settings.
+    Compressors the server or the installed driver extras don't support are skipped.
+
+    Each client owns a connection pool, so clients must be created once at startup
+    and shared (see `connect_to_db`), never created per request.
+    """
+    return MongoClient(
+        uri,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        compressors=settings.MONGO_COMPRESSORS,
+        retryWrites=True,
+        uuidRepresentation="standard",
+    )
+
+
 def connect_to_db():
     """
     Initializes all database clients and attaches them to the DB class.
     This function is called on application startup.
     """
     print("Connecting to UserDB, DataDB, and Redis...")
-    DB.userdb_client = MongoClient(settings.USERDB_MONGO_URI)
-    DB.data_client = MongoClient(settings.DATA_MONGO_URI)
-    DB.redis_client = redis.from_url(settings.REDIS_URL)
+    DB.userdb_client = make_mongo_client(settings.USERDB_MONGO_URI)
+    DB.data_client = make_mongo_client(settings.DATA_MONGO_URI)
+    DB.redis_client = redis.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_keepalive=True,
+        health_check_interval=30,
+        # RESP3 replies, parsed by hiredis when installed, come back as str
+        decode_responses=True,
+        protocol=3,
+    )
     print("Database connections established.")
 
 
@@ -2,7 +2,6 @@
 Centralized rate limiting configuration for the application.
 """
 from slowapi import Limiter # type: ignore
-from slowapi.util import get_remote_address # type: ignore
 from starlette.requests import Request # type: ignore
 
 from core.config import settings
@@ -14,11 +13,26 @@ def key_func(request: Request) -> str:
     It prioritizes the authenticated user's ID if available on the request state.
     If no user is authenticated, it falls back to the client's IP address.
     """
-    if hasattr(request.state, "user") and request.state.user:
-        return request.state.user.user_id
+    user = request.state.user
+    if user is not None:
+        return user.user_id
     
-    # For anonymous requests, fall back to the IP address.
-    return get_remote_address(request)
+    # For anonymous requests, fall back to the IP address, read straight from the
+    # ASGI scope rather than via the Request.client property. Same default as
+    # slowapi's get_remote_address when the server reports no client.
+    client = request.scope.get("client")
+    return client[0] if client else "127.0.0.1"
 
 
-limiter = Limiter(key_func=key_func, storage_uri=settings.REDIS_URL)
+limiter = Limiter(
+    key_func=key_func,
+    storage_uri=settings.REDIS_URL,
+    # The fixed window is checked with one atomic EVALSHA (INCR + EXPIRE in Lua)
+    # per limit, the cheapest Redis-backed strategy.
+    strategy="fixed-window",
+    storage_options={
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "socket_keepalive": True,
+        "health_check_interval": 30,
+    },
+)
@@ -6,25 +6,33 @@ and includes the API routers.
 """
 
 import time
-import json
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+import anyio.to_thread # type: ignore
+import orjson # type: ignore
 from fastapi import FastAPI, Request, HTTPException # type: ignore
 from fastapi.exceptions import RequestValidationError # type: ignore
 from fastapi.middleware.gzip import GZipMiddleware # type: ignore
-from fastapi.responses import JSONResponse # type: ignore
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint # type: ignore
 from starlette.responses import Response # type: ignore
 
+from core.config import settings
 from core.db import DB, close_db_connection, connect_to_db
+from api.custom_responses import ORJSONResponse
 from api.routers import auth, operations
 from services.authn import Auth
 from services.log_manager import LogManager
+from services.query_router import QueryRouter
 from services.exceptions import AuthenticationError
-from models.pydantic_models import TokenData
+from services.utils import user_cache_key
+from models.data_models import TokenData
 from models.log_models import SuccessRequestLog, FailureRequestLog, RequestInfo
 
 logger = LogManager()
 
+# Only these methods carry a request body worth capturing in the usage log
+_BODY_METHODS = frozenset(("POST", "PUT", "PATCH"))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -33,22 +41,30 @@ async def lifespan(app: FastAPI):
     """
     print("--- Starting up application and connecting to databases ---")
     connect_to_db()
+    # Endpoints run their blocking database calls in this threadpool (default 40 threads)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
     
     # Sync Users from MongoDB to Redis for authentication caching
     try:
         userdb = DB.userdb_client.userdb
         users = list(userdb.users.find({}))
+        # One pipelined submission instead of a round trip per user
+        pipe = DB.redis_client.pipeline(transaction=False)
         for user in users:
-            DB.redis_client.hset(
-                user["user_id"],
+            # Rebuilt from scratch so stale cached permissions are dropped
+            user_key = user_cache_key(user["user_id"])
+            pipe.delete(user_key)
+            pipe.hset(
+                user_key,
                 mapping={
-                    "api_key_hash": user["api_key_hash"],
+                    "api_key_hash": user["api_key_hash"].decode(),
                     "role_id": str(user["_id"]),
                     "role": user["role"],
                     "name": user["metadata"].get("name", ""),
                     "dept": user["metadata"].get("department", ""),
                 }
             )
+        pipe.execute()
         print(f"✓ Synced {len(users)} users to Redis cache.")
     except Exception as e:
         print(f"--- Warning: Failed to sync users to Redis on startup: {e} ---")
@@ -56,14 +72,23 @@ async def lifespan(app: FastAPI):
     app.state.userdb_client = DB.userdb_client
     app.state.data_client = DB.data_client
     app.state.redis_client = DB.redis_client
+    app.state.jwt_key = settings.SERVER_SECRET.encode()
+    app.state.auth_service = Auth(r=DB.redis_client, client=DB.userdb_client, key=app.state.jwt_key)
+    app.state.query_router = QueryRouter(
+        userdb_client=DB.userdb_client, data_client=DB.data_client, redis_client=DB.redis_client
+    )
+    # Usage logs are queued by LoggingMiddleware and written in batches
+    logger.start(DB.userdb_client)
     yield
     print("--- Shutting down application and closing connections ---")
+    await logger.stop()
     close_db_connection()
 
 app = FastAPI(
     title="Orb Data Access Layer",
     description="API for interacting with the Orb data service.",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -73,7 +98,7 @@ async def custom_http_exception_handler(request: Request, exc: HTTPException):
     """
     Custom handler for HTTPExceptions to include status_code in the response body.
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"status_code": exc.status_code, "detail": exc.detail},
     )
@@ -84,7 +109,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     """
     Custom handler for validation errors to include status_code in the response body.
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={"status_code": 422, "detail": exc.errors(), "message": "Validation Error"},
     )
@@ -96,7 +121,11 @@ class AuthContextMiddleware(BaseHTTPMiddleware):
     This makes user information available to all subsequent handlers.
     """
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        # Invariant: `request.state.user` and `request.state.user_dump` are always set
+        # (None when unauthenticated), so downstream code reads them directly
+        # instead of probing with hasattr().
         request.state.user = None
+        request.state.user_dump = None
         auth_header = request.headers.get("authorization")
         
         if auth_header:
@@ -104,10 +133,10 @@ class AuthContextMiddleware(BaseHTTPMiddleware):
             if len(parts) == 2 and parts[0].lower() == "bearer":
                 token = parts[1]
                 try:
-                    # Auth operations always use the userdb client
-                    auth_service = Auth(r=request.app.state.redis_client, client=request.app.state.userdb_client)
-                    payload = auth_service.authorize_user(jwt_token=token)
-                    request.state.user = TokenData(**payload)
+                    payload = request.app.state.auth_service.authorize_user(jwt_token=token)
+                    # Trusted: the payload was signed by us and its signature just verified
+                    request.state.user = TokenData.model_construct(**payload)
+                    request.state.user_dump = payload
                 except AuthenticationError:
                     pass 
         
@@ -117,33 +146,47 @@ class AuthContextMiddleware(BaseHTTPMiddleware):
 class LoggingMiddleware(BaseHTTPMiddleware):
     """
     Orchestrates logging for every request, creating a single, comprehensive log
-    entry for either success or failure. It uses Pydantic models for type-safe
+    entry for either success or failure. It uses msgspec log models for type-safe
     log generation and reads context set by inner layers of the application.
     """
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         request.state.log_context = {}
         start_time = time.time()
+        ts = datetime.fromtimestamp(start_time, tz=timezone.utc)
        
         metadata = {}
         user_id = "anonymous"
         role = "unknown"
 
-        if hasattr(request.state, "user") and request.state.user:
-            user_id = request.state.user.user_id
-            role = request.state.user.role
-            metadata = request.state.user.metadata
+        user = request.state.user
+        if user is not None:
+            user_id = user.user_id
+            role = user.role
+            metadata = user.metadata
 
-        request_body_bytes = await request.body()
         request_payload = None
-        if request_body_bytes:
-            if "application/json" in request.headers.get("content-type", ""):
-                try:
-                    request_payload = json.loads(request_body_bytes)
-                except json.JSONDecodeError:
-                    request_payload = {"error": "Request body is not valid JSON"}
-            else:
-                request_payload = {"detail": "Payload not logged for non-JSON content type"}
+        content_length = int(request.headers.get("content-length") or 0)
+        if content_length > settings.LOG_BODY_MAX_BYTES:
+            # Don't buffer large bodies just to log them; the endpoint streams its own copy.
+            request_payload = {"detail": "Payload too large to log", "size": content_length}
+        elif request.method in _BODY_METHODS and (content_length or "transfer-encoding" in request.headers):
+            request_body_bytes = await request.body()
+            if len(request_body_bytes) > settings.LOG_BODY_MAX_BYTES:
+                # Chunked bodies carry no Content-Length, so they can only be measured once read
+                request_payload = {"detail": "Payload too large to log", "size": len(request_body_bytes)}
+            elif request_body_bytes:
+                if "application/json" in request.headers.get("content-type", ""):
+                    try:
+                        request_payload = orjson.loads(request_body_bytes)
+                    except orjson.JSONDecodeError:
+                        request_payload = {"error": "Request body is not valid JSON"}
+                else:
+                    request_payload = {"detail": "Payload not logged for non-JSON content type"}
         
+        if request_payload is not None and not isinstance(request_payload, dict):
+            # JSON arrays/scalars are valid bodies too; keep the payload field a mapping
+            request_payload = {"body": request_payload}
+        # The payload is only recorded, never interpreted; it is walked once when the log is written
         request_info = RequestInfo(method=request.method, path=request.url.path, payload=request_payload)
 
         try:
@@ -154,15 +197,15 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 return response
 
             log_data = SuccessRequestLog(
-                user_id=user_id, role=role, metadata=metadata,
+                ts=ts, user_id=user_id, role=role, metadata=metadata,
                 action=request.state.log_context.get("action", "unknown_route"),
                 request=request_info,
                 response={"status_code": response.status_code},
-                latency_ms=process_time_ms
+                latency_ms=round(process_time_ms, 2)
             )
             try:
-                if request.app.state.userdb_client:
-                    logger.log(client=request.app.state.userdb_client, log_data=log_data)
+                # Queued for the batched background writer, off the request's critical path
+                logger.log(log_data)
             except Exception as e:
                 print(f"--- CRITICAL: Logging failed on success path: {e} ---")
             
@@ -170,14 +213,13 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
         except Exception as exc:
             log_data = FailureRequestLog(
-                user_id=user_id, role=role, metadata=metadata,
+                ts=ts, user_id=user_id, role=role, metadata=metadata,
                 action=request.state.log_context.get("action", "unknown_route"),
                 request=request_info,
                 error={"type": type(exc).__name__, "detail": str(exc)}
             )
             try:
-                if request.app.state.userdb_client:
-                    logger.log(client=request.app.state.userdb_client, log_data=log_data)
+                logger.log(log_data)
             except Exception as e:
                 print(f"--- CRITICAL: Logging failed on exception path: {e} ---")
             
@@ -0,0 +1,17 @@
+"""
+Pydantic models for data shared between the web and service layers.
+"""
+from typing import Any, Dict
+from pydantic import BaseModel, Field # type: ignore
+
+
+class TokenData(BaseModel):
+    """
+    Model representing the data stored within a JWT.
+    Useful for type hinting when the token payload is decoded.
+    """
+    user_id: str
+    role: str
+    metadata: Dict[str, str]
+    permissions: Dict[str, Any]
+    perm_flags: int = Field(0, description="PERM_* bit flags derived from `permissions` at decode time.")
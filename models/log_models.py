@@ -1,52 +1,50 @@
 """
-Pydantic models for logging.
+msgspec models for logging.
 
 These models provide a structured and type-safe way to represent log entries
-before they are inserted into the database. A discriminated union on the 'outcome'
+before they are inserted into the database. A tagged union on the 'outcome'
 field ensures that each log entry conforms to either a Success or Failure schema.
+msgspec Structs are used instead of pydantic models because log entries are
+built from trusted, server-side values and only need fast conversion to BSON-ready dicts.
 """
 
 from datetime import datetime
-from typing import Any, Dict, Literal, Optional, Union
+from typing import Any, Dict, Optional, Union
 
-from pydantic import BaseModel, Field, field_validator # type: ignore
+import msgspec # type: ignore
 
 
-class RequestInfo(BaseModel):
+class RequestInfo(msgspec.Struct, omit_defaults=True):
     """Details of the HTTP request."""
     method: str
     path: str
     payload: Optional[Dict[str, Any]] = None
 
 
-class BaseLog(BaseModel):
+class BaseLog(msgspec.Struct, omit_defaults=True, kw_only=True, tag_field="outcome"):
     """Base model containing fields common to all log entries."""
-    ts: datetime = Field(default_factory=datetime.utcnow)
-    action: str = Field(description="The specific business operation, e.g., 'find_one' or 'create_user'.")
+    ts: datetime  # Timezone-aware UTC time the request started
+    action: str  # The specific business operation, e.g., 'find_one' or 'create_user'
     user_id: str
     role: str
     metadata: Dict[str, str]
     request: RequestInfo
 
-    class Config:
-        use_enum_values = True
 
-
-class SuccessRequestLog(BaseLog):
+class SuccessRequestLog(BaseLog, tag="Success"):
     """Schema for a successful API request log."""
-    outcome: Literal["Success"] = "Success"
     response: Dict[str, Any]
-    latency_ms: float
-
-    @field_validator('latency_ms')
-    def round_latency(cls, v):
-        return round(v, 2)
+    latency_ms: float  # Rounded to 2 decimal places by the caller
 
 
-class FailureRequestLog(BaseLog):
+class FailureRequestLog(BaseLog, tag="Failure"):
     """Schema for a failed API request log."""
-    outcome: Literal["Failure"] = "Failure"
     error: Dict[str, Any]
 
 
 LogEntry = Union[SuccessRequestLog, FailureRequestLog]
+
+
+def to_document(entry: LogEntry) -> Dict[str, Any]:
+    """Converts a log entry to a dict ready for insertion, keeping `ts` as a datetime (BSON date)."""
+    return msgspec.to_builtins(entry, builtin_types=(datetime,))
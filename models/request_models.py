@@ -0,0 +1,109 @@
+"""
+Pydantic models for request validation.
+
+These models define the bodies accepted by the user management and data
+operation endpoints.
+"""
+from typing import Annotated, Any, Dict, List, Optional, Union, Literal, Tuple
+from pydantic import BaseModel, Discriminator, Field, RootModel, Tag # type: ignore
+
+
+def _permission_kind(value: Any) -> str:
+    """Picks the PermissionSpec branch up front, so only one validator runs."""
+    return "preset" if isinstance(value, str) else "mapping"
+
+
+# A permission grant: either the 'all'/'none' preset or a mapping of databases to collections
+PermissionSpec = Annotated[
+    Union[
+        Annotated[Literal["all", "none"], Tag("preset")],
+        Annotated[Dict[str, List[str]], Tag("mapping")],
+    ],
+    Discriminator(_permission_kind),
+]
+
+
+class Permissions(RootModel[PermissionSpec]):
+    """
+    A single permission grant, validated by one shared schema.
+    The cheap 'all'/'none' preset is listed first; `model_dump()` yields the bare value.
+    """
+
+
+class UserCreate(BaseModel):
+    """
+    Model representing the data required to create a new user.
+    Used as the request body for the user creation endpoint.
+    """
+    user_id: str = Field(..., description="The unique identifier for the user.")
+    policy: str = Field(..., description="The access policy/role to assign to the user (e.g., 'admin', 'senior_dev').")
+    name: str = Field(..., description="The user's full name.")
+    department: str = Field(..., description="The user's department.")
+    read_permissions: Optional[Permissions] = Field(
+        None,
+        alias="read",
+        description="Read permissions, as a mapping of databases to collections or 'all'/'none'."
+    )
+    write_permissions: Optional[Permissions] = Field(
+        None,
+        alias="write",
+        description="Write permissions, as a mapping of databases to collections or 'all'/'none'."
+    )
+
+class UserUpdate(BaseModel):
+    """
+    Model for updating a user's policy or permissions.
+    All fields are optional, as a client might only want to update one thing.
+    """
+    policy: Optional[str] = Field(None, description="The new policy to assign to the user.")
+    permissions: Optional[Dict[str, Permissions]] = Field(
+        None,
+        description="The new permissions to assign, e.g., {'read': {'db': ['coll']}} or {'write': 'all'}."
+    )
+
+
+class DataQuery(BaseModel):
+    """Model for generic data read queries."""
+    db: str = Field(..., description="The database to query.")
+    collection: str = Field(..., description="The collection to query.")
+    query: Dict[str, Any] = Field({}, description="The query filter (e.g., {'_id': '...'}).")
+    projection: Optional[Dict[str, int]] = Field(None, description="Specifies the fields to return.")
+    fields: Optional[List[str]] = Field(None, description="Shorthand projection: return only these fields (and _id).")
+    sort: Optional[List[Tuple[str, int]]] = Field(None, description="Specifies the sort order (e.g., [['field', 1]]).")
+    limit: Optional[int] = Field(None, gt=0, description="The maximum number of documents to return.")
+    offset: Optional[int] = Field(None, ge=0, description="The number of documents to skip.")
+    batch_size: Optional[int] = Field(None, gt=0, description="Specifies the number of documents in each batch.")
+
+
+class DataUpdate(DataQuery):
+    """Model for generic data update operations."""
+    update: Dict[str, Any] = Field(..., description="The update operation (e.g., {'$set': {'field': 'value'}}).")
+
+
+class BulkInsertOne(BaseModel):
+    """A document to insert as part of a bulk write."""
+    op: Literal["insert_one"]
+    document: Dict[str, Any] = Field(..., description="The document to insert.")
+
+
+class BulkUpdate(BaseModel):
+    """An update, of one or all matching documents, as part of a bulk write."""
+    op: Literal["update_one", "update_many"]
+    query: Dict[str, Any] = Field(..., description="The filter selecting the documents to update.")
+    update: Dict[str, Any] = Field(..., description="The update operation (e.g., {'$set': {'field': 'value'}}).")
+
+
+class BulkDelete(BaseModel):
+    """A delete, of one or all matching documents, as part of a bulk write."""
+    op: Literal["delete_one", "delete_many"]
+    query: Dict[str, Any] = Field(..., description="The filter selecting the documents to delete.")
+
+
+BulkWriteOp = Annotated[Union[BulkInsertOne, BulkUpdate, BulkDelete], Field(discriminator="op")]
+
+
+class DataBulkWrite(BaseModel):
+    """Model for a batch of write operations on one collection, sent as a single command."""
+    db: str = Field(..., description="The database to write to.")
+    collection: str = Field(..., description="The collection to write to.")
+    operations: List[BulkWriteOp] = Field(..., min_length=1, description="The writes to perform, unordered.")
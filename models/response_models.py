@@ -0,0 +1,83 @@
+"""
+Pydantic models for response serialization.
+
+These models document the shapes returned by the API; endpoints build them
+with `model_construct` since their contents are server-generated.
+"""
+from typing import Dict, List
+from pydantic import BaseModel, ConfigDict # type: ignore
+
+from .data_models import TokenData
+
+
+class UserView(BaseModel):
+    """
+    A 'view' model representing a user in API responses.
+    This model safely exposes only non-sensitive user data.
+    """
+    user_id: str
+    metadata: Dict[str, str]
+    role: str
+    user_management: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserCreateResponse(BaseModel):
+    """
+    Response model for a newly created user.
+    Crucially, this includes the one-time API key.
+    """
+    message: str = "User created successfully. Please store this API key securely as it will not be shown again."
+    user_id: str
+    api_key: str
+    status_code: int = 201
+
+
+class Token(BaseModel):
+    """Model for the JWT access token response, following OAuth2 standards."""
+    access_token: str
+    token_type: str = "bearer"
+    status_code: int = 200
+
+
+class UserMeResponse(TokenData):
+    """
+    Response model for the /users/me endpoint.
+    Wraps the user data with a status code.
+    """
+    status_code: int = 200
+
+
+class CountResponse(BaseModel):
+    """A generic response model for returning a document count."""
+    count: int
+    status_code: int = 200
+
+
+class BulkWriteErrorView(BaseModel):
+    """One failed operation of a bulk write, identified by its position in `operations`."""
+    index: int
+    code: int
+    errmsg: str
+
+
+class BulkWriteResponse(BaseModel):
+    """
+    Response model for a bulk write, with the counts reported by the server.
+    If some operations failed, the others are still applied: the counts cover
+    the applied ones, `write_errors` lists the failures and the status is 207.
+    """
+    inserted_count: int
+    matched_count: int
+    modified_count: int
+    deleted_count: int
+    write_errors: List[BulkWriteErrorView] = []
+    status_code: int = 200
+
+
+class StatusResponse(BaseModel):
+    """A generic response model for returning a status message."""
+    status: str = "ok"
+    status_code: int = 200
+    message: str
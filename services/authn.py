@@ -2,44 +2,93 @@
 Auth Module for Orb
 """
 import os
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Union
+import time
+from typing import Any, Dict, Optional, Union
 from core.config import settings
 import jwt  # type: ignore
+import orjson  # type: ignore
+from jwt.algorithms import HMACAlgorithm  # type: ignore
 import redis  # type: ignore
 from bson import ObjectId  # type: ignore
+from bson.errors import InvalidId  # type: ignore
 from pymongo import MongoClient, errors  # type: ignore
 
 from .exceptions import AuthenticationError, DatabaseError
-from .utils import verify_key
+from .jwt_cache import jwt_cache
+from .utils import (CACHED_PERMISSIONS_FIELD, permissions_fingerprint, user_cache_key,
+                    verify_key)
+
+_HS256 = HMACAlgorithm(HMACAlgorithm.SHA256)
+
+# Token lifetime; `exp` is written as an int epoch, which is what PyJWT would encode anyway
+_EXP_SECONDS = 2 * 3600
+
+# Lifetime of a user hash once permissions are cached in it. update_user drops the
+# hash on a change; the TTL bounds drift from direct DB edits or a failed invalidation.
+_PERM_CACHE_TTL_SECONDS = 300
+
+# Bit flags summarizing a token's permissions, computed once at decode time
+PERM_USER_MGMT = 1
+PERM_READ = 2
+PERM_WRITE = 4
+
+
+def _perm_flags(permissions: Dict[str, Any]) -> int:
+    """Packs a permissions mapping into PERM_* flags. 'none' grants nothing."""
+    flags = 0
+    if permissions.get("user_management"):
+        flags |= PERM_USER_MGMT
+    read = permissions.get("read")
+    if read and read != "none":
+        flags |= PERM_READ
+    write = permissions.get("write")
+    if write and write != "none":
+        flags |= PERM_WRITE
+    return flags
 
 
 class Auth:
-    def __init__(self, r: redis.Redis, client: MongoClient):
+    def __init__(self, r: redis.Redis, client: MongoClient, key: Optional[bytes] = None):
         self.redis_client = r
         self.action = "Authentication"
         self.mongo_client = client
+        # HS256 signing key, prepared once here rather than inside every jwt.encode/decode.
+        # Callers pass the bytes precomputed at startup (app.state.jwt_key).
+        secret = key if key is not None else settings.SERVER_SECRET
+        if not secret:
+            # Fail at startup rather than on every request
+            raise RuntimeError("Server secret is not configured.")
+        self.key = _HS256.prepare_key(secret)
 
     def authorize_user(self, jwt_token: str) -> Dict[str, Any]:
         """
         Validates a JWT and returns the payload if valid.
+        When the JWT cache is enabled, a token verified recently is served from
+        the cache without re-checking its signature; entries never outlive `exp`.
 
         Args:
-            user_id: The user ID for whom the token is being validated. (Note: currently unused for validation itself)
             jwt_token: The user-provided JWT.
 
         Returns:
-            The decoded token payload.
+            The decoded token payload, with `perm_flags` added.
 
         Raises:
             AuthenticationError: If the token is expired or invalid.
         """
-        secret = settings.SERVER_SECRET
-        if not secret:
-            raise AuthenticationError("Server secret is not configured.")
+        if jwt_cache:
+            cached = jwt_cache.get(jwt_token)
+            if cached is not None:
+                return cached
 
         try:
-            payload = jwt.decode(jwt_token, secret, algorithms=["HS256"], options={"verify_exp": True})
+            payload = jwt.decode(jwt_token, self.key, algorithms=["HS256"], options={"verify_exp": True})
+            permissions = payload.get("permissions") or {}
+            payload["perm_flags"] = _perm_flags(permissions)
+            if "perms_fp" not in payload:
+                # Only tokens issued before `perms_fp` was a signed claim
+                payload["perms_fp"] = permissions_fingerprint(permissions)
+            if jwt_cache:
+                jwt_cache.set(jwt_token, payload)
             return payload
         except jwt.ExpiredSignatureError:
             raise AuthenticationError("Token has expired.")
@@ -65,11 +114,11 @@ class Auth:
         if not api_key:
             raise AuthenticationError("API key was not provided.")
 
-        user_data = None
-        
-        # 1. Try Cache (Redis)
-        if self.redis_client.exists(user_id):
-            user_data = self.redis_client.hgetall(user_id)
+        # 1. Try Cache (Redis); the hash also carries the cached permissions, so a
+        # single HGETALL returns everything. It is empty for a missing key.
+        user_key = user_cache_key(user_id)
+        user_data = self.redis_client.hgetall(user_key)
+        cached_permissions = user_data.get(CACHED_PERMISSIONS_FIELD)
 
         # 2. Fallback to Database (Mongo)
         if not user_data:
@@ -79,9 +128,8 @@ class Auth:
                     raise AuthenticationError(f"User '{user_id}' not found.")
                 
                 # Prepare data structure from Mongo document
-                # Note: These values are strings, unlike Redis which returns bytes
                 user_data = {
-                    "api_key_hash": mongo_user["api_key_hash"],
+                    "api_key_hash": mongo_user["api_key_hash"].decode(),
                     "role_id": str(mongo_user["_id"]),
                     "role": mongo_user["role"],
                     "name": mongo_user["metadata"].get("name", ""),
@@ -89,15 +137,14 @@ class Auth:
                 }
                 
                 # 3. Self-Heal: Populate Redis for next time
-                self.redis_client.hset(user_id, mapping=user_data)
+                self.redis_client.hset(user_key, mapping=user_data)
                 
             except errors.PyMongoError as e:
                 # If Mongo fails too, we are truly stuck
                 raise DatabaseError(f"Authentication failed due to database error: {e}")
 
         # 4. Verify Password
-        # Handle both string (Mongo) and bytes (Redis) keys
-        hashed_key = user_data.get('api_key_hash') or user_data.get(b'api_key_hash')
+        hashed_key = user_data.get("api_key_hash")
         
         if not hashed_key:
              # Should practically never happen if user exists, but good for safety
@@ -106,63 +153,59 @@ class Auth:
         if not verify_key(api_key, hashed_key):
             raise AuthenticationError("Invalid API key provided.")
 
-        # 5. Get Permissions (Always from Mongo to ensure freshness of access rules)
-        role_id_raw = user_data.get('role_id') or user_data.get(b'role_id')
-        if not role_id_raw:
+        # 5. Get Permissions (from the cached hash above, else from Mongo)
+        role_id = user_data.get("role_id")
+        if not role_id:
              raise AuthenticationError(f"User '{user_id}' has no role ID assigned.")
-        
-        # Ensure role_id is string for ObjectId
-        role_id = role_id_raw.decode('utf-8') if isinstance(role_id_raw, bytes) else role_id_raw
 
-        try:
-            permissions = self.mongo_client.userdb.users.find_one(
-                {"_id": ObjectId(role_id)},
-                {"_id": 0, "read": 1, "write": 1, "user_management": 1}
-            )
-        except errors.PyMongoError as e:
-            raise DatabaseError(f"Failed to fetch permissions for user '{user_id}': {e}")
+        if cached_permissions:
+            permissions = orjson.loads(cached_permissions)
+        else:
+            try:
+                role_oid = ObjectId(role_id)
+            except InvalidId:
+                raise AuthenticationError(f"User '{user_id}' has corrupted data (invalid role ID).")
+
+            try:
+                permissions = self.mongo_client.userdb.users.find_one(
+                    {"_id": role_oid},
+                    {"_id": 0, "read": 1, "write": 1, "user_management": 1}
+                )
+            except errors.PyMongoError as e:
+                raise DatabaseError(f"Failed to fetch permissions for user '{user_id}': {e}")
 
-        if not permissions:
-            raise AuthenticationError(f"Could not find permissions for user '{user_id}'.")
+            if not permissions:
+                raise AuthenticationError(f"Could not find permissions for user '{user_id}'.")
+
+            # The whole hash expires, so role and metadata are refreshed from Mongo too
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(user_key, CACHED_PERMISSIONS_FIELD, orjson.dumps(permissions))
+            pipe.expire(user_key, _PERM_CACHE_TTL_SECONDS)
+            pipe.execute()
 
         token = self._create_jwt(user_id=user_id, user_info=user_data, permissions=permissions)
 
         return token
 
-    def _get_str_val(self, data: Dict, key_str: str, key_bytes: bytes) -> str:
-        """Helper to retrieve a string value whether the dict uses str or bytes keys."""
-        val = data.get(key_str)
-        if val is None:
-            val = data.get(key_bytes)
-        
-        if val is None:
-            return ""
-            
-        if isinstance(val, bytes):
-            return val.decode('utf-8')
-        return str(val)
-
     def _create_jwt(self, user_id: str, user_info: dict, permissions: dict) -> str:
         """
         Internal function to generate a JWT.
-        Robust to both string (Mongo) and bytes (Redis) inputs.
+        Expects `user_info` with str values, as built by `authenticate_user`.
         """
-        secret = settings.SERVER_SECRET
-        if not secret:
-            raise AuthenticationError("Server secret is not configured.")
-
         try:
             payload = {
                 "user_id": user_id,
-                "role": self._get_str_val(user_info, 'role', b'role'),
+                "role": user_info.get("role", ""),
                 "metadata": {
-                    "name": self._get_str_val(user_info, 'name', b'name'),
-                    "dept": self._get_str_val(user_info, 'dept', b'dept')
+                    "name": user_info.get("name", ""),
+                    "dept": user_info.get("dept", "")
                 },
                 "permissions": permissions,
-                "exp": datetime.now(timezone.utc) + timedelta(hours=2)
+                # Signed with the rest, so requests never recompute it (see QueryRouter._validate_auth)
+                "perms_fp": permissions_fingerprint(permissions),
+                "exp": int(time.time()) + _EXP_SECONDS
             }
-            token = jwt.encode(payload, secret, algorithm="HS256")
+            token = jwt.encode(payload, self.key, algorithm="HS256")
             return token
         except Exception as e:
             raise AuthenticationError(f"Failed to create JWT: {e}")
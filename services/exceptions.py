@@ -3,48 +3,57 @@
 
 class OrbError(Exception):
     """Base exception class for the application."""
-    def __init__(self, message="An unexpected error occurred."):
-        self.message = message
-        super().__init__(self.message)
+    default_message = "An unexpected error occurred."
+
+    def __init__(self, message=None):
+        super().__init__(message or self.default_message)
 
 
 class DatabaseError(OrbError):
     """Raised for general database-related errors."""
-    def __init__(self, message="A database error occurred."):
-        super().__init__(message)
+    default_message = "A database error occurred."
 
 
 class DocumentNotFoundError(DatabaseError):
     """Raised when a specific document is not found in the database."""
-    def __init__(self, message="The requested document was not found."):
-        super().__init__(message)
+    default_message = "The requested document was not found."
 
 
 class DuplicateUserError(DatabaseError):
     """Raised when attempting to create a user that already exists."""
-    def __init__(self, message="This user ID already exists."):
+    default_message = "This user ID already exists."
+
+
+class PageTooLargeError(DatabaseError):
+    """Raised when a page of documents exceeds the 16 MB BSON document limit."""
+    default_message = "The page is too large; use a smaller limit or a fields projection."
+
+
+class PartialUserCreationError(DatabaseError):
+    """Raised when some users of a bulk creation failed for reasons other than a duplicate."""
+    default_message = "Some users could not be created."
+
+    def __init__(self, message=None, created=None):
         super().__init__(message)
+        # One-time API keys of the users that were created, by user_id
+        self.created = created or {}
 
 
 class PolicyNotFoundError(DatabaseError):
     """Raised when a specified policy is not found in the policy store."""
-    def __init__(self, message="The specified policy was not found."):
-        super().__init__(message)
+    default_message = "The specified policy was not found."
 
 
 class AuthenticationError(OrbError):
     """Raised for authentication failures (e.g., invalid API key or expired token)."""
-    def __init__(self, message="Authentication failed."):
-        super().__init__(message)
+    default_message = "Authentication failed."
 
 
 class AuthorizationError(OrbError):
     """Raised for authorization failures (e.g., insufficient permissions)."""
-    def __init__(self, message="You are not authorized to perform this action."):
-        super().__init__(message)
+    default_message = "You are not authorized to perform this action."
 
 
 class ExplicitDenyError(AuthorizationError):
     """Raised when access is denied by an explicit 'none' rule."""
-    def __init__(self, message="This action is explicitly denied by your permissions policy."):
-        super().__init__(message)
+    default_message = "This action is explicitly denied by your permissions policy."
@@ -0,0 +1,58 @@
+"""
+Short-lived cache for verified JWT payloads.
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache # type: ignore
+
+from core.config import settings
+
+
+class JWTCache:
+    """
+    A bounded TTL cache of decoded JWT payloads.
+
+    Entries are keyed by a digest of the raw token (the token itself is never
+    held as a key) and never outlive the token's own `exp` claim.
+    """
+    def __init__(self, maxsize: int, ttl: int):
+        self._ttl = ttl
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached payload for a token, or None on a miss or stale entry."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._cache[key]
+                return None
+        return payload
+
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        """Caches a verified payload until the TTL or the token's `exp`, whichever comes first."""
+        expires_at = time.time() + self._ttl
+        exp = payload.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._cache[self._key(token)] = (payload, expires_at)
+
+
+# Opt-in: None unless JWT_CACHE_ENABLED is set in the environment
+jwt_cache: Optional[JWTCache] = (
+    JWTCache(maxsize=settings.JWT_CACHE_MAXSIZE, ttl=settings.JWT_CACHE_TTL_SECONDS)
+    if settings.JWT_CACHE_ENABLED
+    else None
+)
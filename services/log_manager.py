@@ -1,29 +1,146 @@
 """
 The logging module.
 """
-from pymongo import MongoClient # type: ignore
-from models.log_models import LogEntry
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import bson # type: ignore
+from bson.errors import InvalidDocument # type: ignore
+from pymongo import MongoClient, WriteConcern # type: ignore
+from pymongo.collection import Collection # type: ignore
+
+from models.log_models import LogEntry, to_document
+
+# A batch is flushed once it holds this many entries or this long after its first entry
+_LOG_BATCH_SIZE = 256
+_LOG_FLUSH_INTERVAL_SECONDS = 0.05
+_LOG_QUEUE_MAXSIZE = 10_000
+
+# Errors bson raises for a value it cannot encode, e.g. an int wider than 8 bytes
+_ENCODE_ERRORS = (InvalidDocument, OverflowError)
+
+
+def _encodable(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Returns the document if bson can encode it, else the document with its request
+    payload replaced by a placeholder, or None if it still cannot be encoded.
+    """
+    try:
+        bson.encode(doc)
+        return doc
+    except _ENCODE_ERRORS:
+        pass
+    if "payload" in doc.get("request", {}):
+        doc["request"]["payload"] = {"detail": "Payload could not be encoded to BSON"}
+        try:
+            bson.encode(doc)
+            return doc
+        except _ENCODE_ERRORS:
+            pass
+    print(f"--- Database logging dropped an entry that could not be encoded: {doc.get('action')} ---")
+    return None
 
 
 class LogManager:
     """
     Writes usage logs to the database in a structured format.
+
+    Requests only enqueue their log entry; a background task started
+    in the app lifespan drains the queue and writes entries in batches.
     """
-    
-    def log(self, client: MongoClient, log_data: LogEntry) -> None:
+
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._logs: Optional[Collection] = None
+        self._collecting: List[LogEntry] = []
+        # Entries discarded because the queue was full, reported on shutdown
+        self.dropped = 0
+
+    def start(self, client: MongoClient) -> None:
         """
-        Inserts a structured log entry into the database.
+        Starts the background flusher. Must be called from the running event loop.
 
         Args:
             client: The MongoClient used to connect to the database.
-            log_data: A Pydantic model instance (SuccessRequestLog or FailureRequestLog)
-                      containing the structured data to be logged.
+        """
+        # Unacknowledged writes: usage logs trade durability for not waiting on the server
+        self._logs = client["userdb"].get_collection("usage_logs", write_concern=WriteConcern(w=0))
+        self._queue = asyncio.Queue(maxsize=_LOG_QUEUE_MAXSIZE)
+        self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        """Stops the background flusher, then writes whatever is still queued."""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        if self._queue is not None:
+            remaining, self._collecting = self._collecting, []
+            while not self._queue.empty():
+                remaining.append(self._queue.get_nowait())
+            # Further log() calls during shutdown are ignored
+            self._queue = None
+            for i in range(0, len(remaining), _LOG_BATCH_SIZE):
+                await asyncio.to_thread(self._write_batch, remaining[i:i + _LOG_BATCH_SIZE])
+
+        if self.dropped:
+            print(f"--- Database logging dropped {self.dropped} entries (queue full) ---")
+
+    def log(self, log_data: LogEntry) -> None:
+        """
+        Queues a structured log entry for insertion. Never blocks the caller;
+        the entry is only converted to a document by the background writer.
+
+        Args:
+            log_data: A SuccessRequestLog or FailureRequestLog.
+        """
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(log_data)
+        except asyncio.QueueFull:
+            if not self.dropped:
+                print("--- Database logging queue is full; dropping log entries ---")
+            self.dropped += 1
+
+    async def _flush_forever(self) -> None:
+        """Collects entries into batches and writes each batch off the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            # The batch being collected is kept on self so stop() can still write it
+            self._collecting = batch = [await self._queue.get()]
+            deadline = loop.time() + _LOG_FLUSH_INTERVAL_SECONDS
+            while len(batch) < _LOG_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._collecting = []
+            await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, batch: List[LogEntry]) -> None:
+        """
+        Inserts a batch of log entries with a single, unacknowledged insert_many.
+        If an entry cannot be encoded, the batch is checked entry by entry and
+        retried, so one bad payload doesn't lose the other entries.
         """
         try:
-            db = client["userdb"]
-            coll = db["usage_logs"]
-            log_dict = log_data.model_dump(exclude_none=True)
-            
-            coll.insert_one(log_dict)
+            docs = [to_document(log_data) for log_data in batch]
+            # bypass_document_validation is not allowed with w=0
+            try:
+                self._logs.insert_many(docs, ordered=False)
+            except _ENCODE_ERRORS:
+                # Encoding fails before anything is sent, so the retry writes no duplicates
+                docs = [doc for doc in map(_encodable, docs) if doc is not None]
+                if docs:
+                    self._logs.insert_many(docs, ordered=False)
         except Exception as e:
             print(f"--- Database logging failed: {e} ---")
@@ -3,22 +3,78 @@ Operations Interface for Mongo
 """
 
 import secrets
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import bcrypt # type: ignore
 from bson import ObjectId # type: ignore
-from pymongo import MongoClient, cursor # type: ignore
-from pymongo.errors import DuplicateKeyError, PyMongoError # type: ignore
+from bson.codec_options import TypeDecoder, TypeRegistry # type: ignore
+from pymongo import DeleteMany, DeleteOne, InsertOne, MongoClient, UpdateMany, UpdateOne, cursor # type: ignore
+from pymongo.collection import Collection # type: ignore
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError # type: ignore
 from redis import Redis # type: ignore
+from redis.exceptions import RedisError # type: ignore
 
-from .exceptions import (DatabaseError, DocumentNotFoundError,
-                         DuplicateUserError, PolicyNotFoundError)
+from .exceptions import (DatabaseError, DocumentNotFoundError, DuplicateUserError,
+                         PageTooLargeError, PartialUserCreationError, PolicyNotFoundError)
+from .utils import hash_keys, user_cache_key
+
+# Valid policy names, cached as a Redis set so user creation doesn't query policy_store.
+# The set is only reloaded once it has expired, so policies added to Mongo are picked
+# up within the TTL and unknown names cannot force repeated policy_store scans.
+_POLICY_SET_KEY = "orb:policies"
+_POLICY_SET_TTL_SECONDS = 300
+
+# Documents per cursor batch when the caller doesn't choose; the server default
+# is 101 documents for the first batch
+_DEFAULT_BATCH_SIZE = 1000
+
+# Upper bound on a find_page page. The page is returned inside a single $facet result
+# document, so it must also fit in 16 MB: this cap alone only guarantees that for
+# documents under ~16 KB, and larger pages fail with PageTooLargeError.
+_MAX_PAGE_SIZE = 1000
+
+# Server error codes for a $facet result over the BSON document size limit
+_FACET_TOO_LARGE_CODES = {10334, 4031700}
+
+
+class _ObjectIdToStr(TypeDecoder):
+    """
+    Decodes ObjectIds straight to str inside PyMongo's BSON decoder, so fetched
+    documents need no Python pass to make them JSON-ready. Decode-only: PyMongo
+    refuses custom encoders for BSON's built-in types.
+    """
+    bson_type = ObjectId
+
+    def transform_bson(self, value: ObjectId) -> str:
+        return str(value)
+
+
+_DATA_TYPE_REGISTRY = TypeRegistry([_ObjectIdToStr()])
 
 
 class Mongo:
     def __init__(self, mongo_client: MongoClient, redis_client: Redis):
         self.mongo_client = mongo_client
         self.redis_client = redis_client
+        # Collection handles are reused rather than rebuilt through client[db][coll] on every call
+        self._users: Collection = mongo_client["userdb"]["users"]
+        self._policy_store: Collection = mongo_client["userdb"]["policy_store"]
+        self._coll_cache: Dict[Tuple[str, str], Collection] = {}
+
+    def _coll(self, db: str, coll: str) -> Collection:
+        """
+        Returns the (memoized) handle for a data collection.
+        Documents read through it carry ObjectIds (including `_id`) as strings.
+        """
+        key = (db, coll)
+        collection = self._coll_cache.get(key)
+        if collection is None:
+            database = self.mongo_client[db]
+            # Keep the client's codec settings (e.g. uuidRepresentation), only add the decoder
+            codec_options = database.codec_options.with_options(type_registry=_DATA_TYPE_REGISTRY)
+            collection = self._coll_cache.setdefault(
+                key, database.get_collection(coll, codec_options=codec_options)
+            )
+        return collection
 
     def create_user(
         self,
@@ -30,63 +86,145 @@ class Mongo:
         """
         Function to add a user into the users collection and update the Redis cache.
         """
-        db = self.mongo_client["userdb"]
-        users = db["users"]
-
-        policy_present = db.policy_store.find_one({"policy": policy})
-        if not policy_present:
-            raise PolicyNotFoundError(f"Policy '{policy}' not found.")
-
-        api_key = secrets.token_urlsafe(32)
-        api_key_hash = bcrypt.hashpw(api_key.encode(), salt=bcrypt.gensalt())
-        
-        doc: Dict[str, Any] = {
-            "_id": ObjectId(),
-            "user_id": user_id,
-            "api_key_hash": api_key_hash,
-            "metadata": metadata,
-            "role": policy,
-        }
-
-        if policy == "admin":
-            doc.update({"read": "all", "write": "all", "user_management": True})
-        else:
-            doc["user_management"] = False
-            if perm.get("write") is not None:
-                doc["write"] = perm.get("write")
-            if perm.get("read") is not None:
-                doc["read"] = perm.get("read")
-
-        try:
-            # 1. Insert into MongoDB
-            users.insert_one(doc)
-
-            # 2. Insert into Redis Cache
-            self.redis_client.hset(
-                user_id,
-                mapping={
-                    "api_key_hash": api_key_hash,
-                    "role_id": str(doc["_id"]),
-                    "role": doc["role"],
-                    "name": doc["metadata"].get("name", ""),
-                    "dept": doc["metadata"].get("department", ""),
-                },
+        api_keys = self.create_users_bulk(
+            [{"user_id": user_id, "policy": policy, "metadata": metadata, "perm": perm}]
+        )
+        if user_id not in api_keys:
+            raise DuplicateUserError(f"User '{user_id}' already exists.")
+        return api_keys[user_id]
+
+    def create_users_bulk(self, users: List[dict]) -> Dict[str, str]:
+        """
+        Adds several users with one insert_many and one pipelined Redis write.
+        Each entry takes the `create_user` arguments: user_id, policy, metadata, perm.
+
+        Returns:
+            The one-time API key of every user that was created, by user_id.
+            Users that already exist are skipped and left out of the result.
+
+        Raises:
+            PartialUserCreationError: If some users failed for another reason. The users
+                that were created are still cached, and their keys are in `created`.
+        """
+        if not users:
+            return {}
+
+        missing = self._unknown_policies({user["policy"] for user in users})
+        if missing:
+            raise PolicyNotFoundError(f"Policy '{', '.join(sorted(missing))}' not found.")
+
+        api_keys = [secrets.token_urlsafe(32) for _ in users]
+        api_key_hashes = hash_keys(api_keys)
+
+        docs: List[Dict[str, Any]] = []
+        for user, api_key_hash in zip(users, api_key_hashes):
+            policy, perm = user["policy"], user["perm"]
+            doc: Dict[str, Any] = {
+                "_id": ObjectId(),
+                "user_id": user["user_id"],
+                "api_key_hash": api_key_hash,
+                "metadata": user["metadata"],
+                "role": policy,
+            }
+
+            if policy == "admin":
+                doc.update({"read": "all", "write": "all", "user_management": True})
+            else:
+                doc["user_management"] = False
+                if perm.get("write") is not None:
+                    doc["write"] = perm.get("write")
+                if perm.get("read") is not None:
+                    doc["read"] = perm.get("read")
+
+            docs.append(doc)
+
+        # 1. Insert into MongoDB; unordered, so one duplicate doesn't stop the rest
+        failed = set()
+        errors: List[str] = []
+        try:
+            self._users.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed.add(error["index"])
+                if error.get("code") != 11000:
+                    errors.append(f"'{docs[error['index']]['user_id']}': {error.get('errmsg')}")
+        except PyMongoError as e:
+            raise DatabaseError(f"Failed to create users in DB: {e}")
+
+        created = [(doc, key) for i, (doc, key) in enumerate(zip(docs, api_keys)) if i not in failed]
+
+        # 2. Insert into Redis Cache, all users in one round trip. The users already
+        # exist in Mongo, so a cache failure is not fatal: authentication falls back
+        # to Mongo and repopulates the cache.
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for doc, _ in created:
+                pipe.hset(
+                    user_cache_key(doc["user_id"]),
+                    mapping={
+                        "api_key_hash": doc["api_key_hash"].decode(),
+                        "role_id": str(doc["_id"]),
+                        "role": doc["role"],
+                        "name": doc["metadata"].get("name", ""),
+                        "dept": doc["metadata"].get("department", ""),
+                    },
+                )
+            pipe.execute()
+        except RedisError as e:
+            print(f"--- Warning: Failed to cache created users in Redis: {e} ---")
+
+        created_keys = {doc["user_id"]: key for doc, key in created}
+        if errors:
+            raise PartialUserCreationError(
+                f"Failed to create users in DB: {'; '.join(errors)}", created=created_keys
             )
+        return created_keys
 
-            return api_key
-            
-        except DuplicateKeyError:
-            raise DuplicateUserError(f"User '{user_id}' already exists.")
+    def _unknown_policies(self, policies: set) -> set:
+        """
+        Returns the names in `policies` that are not in the policy store.
+        Checks the cached Redis set and reloads it from Mongo only if it is missing.
+        If Redis is unavailable, the requested names are looked up in Mongo directly.
+        """
+        names = list(policies)
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.exists(_POLICY_SET_KEY)
+            pipe.smismember(_POLICY_SET_KEY, names)
+            cached, members = pipe.execute()
+        except RedisError as e:
+            print(f"--- Warning: Policy cache unavailable, checking policy_store: {e} ---")
+            try:
+                known = {
+                    p["policy"]
+                    for p in self._policy_store.find({"policy": {"$in": names}}, {"_id": 0, "policy": 1})
+                }
+            except PyMongoError as e:
+                raise DatabaseError(f"Failed to check policies: {e}")
+            return policies - known
+        if cached:
+            return {name for name, member in zip(names, members) if not member}
+
+        try:
+            known = {
+                p["policy"] for p in self._policy_store.find({}, {"_id": 0, "policy": 1})
+            }
         except PyMongoError as e:
-            raise DatabaseError(f"Failed to create user in DB: {e}")
-        except Exception as e:
-            # Catch other potential errors, including Redis errors
-            raise DatabaseError(f"An unexpected error occurred during user creation: {e}")
+            raise DatabaseError(f"Failed to load policies: {e}")
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(_POLICY_SET_KEY)
+            if known:
+                pipe.sadd(_POLICY_SET_KEY, *known)
+                pipe.expire(_POLICY_SET_KEY, _POLICY_SET_TTL_SECONDS)
+            pipe.execute()
+        except RedisError as e:
+            print(f"--- Warning: Failed to cache policies in Redis: {e} ---")
+        return policies - known
 
     def delete_user(self, user_id: str) -> bool:
         """Deletes a user from MongoDB and the Redis cache."""
-        database = self.mongo_client["userdb"]
-        collection = database["users"]
+        collection = self._users
         doc = {"user_id": user_id}
         try:
             # 1. Delete from MongoDB
@@ -94,53 +232,69 @@ class Mongo:
             if result.deleted_count == 0:
                 raise DocumentNotFoundError(f"User '{user_id}' not found for deletion.")
 
-            # 2. Delete from Redis Cache
-            self.redis_client.delete(user_id)
+            # 2. Delete from Redis Cache (user hash and cached permissions)
+            self.redis_client.delete(user_cache_key(user_id))
             return True
         except PyMongoError as e:
             raise DatabaseError(f"Failed to delete user: {e}")
         except Exception as e:
             raise DatabaseError(f"An unexpected error occurred during user deletion: {e}")
 
-    def update_user(self, user_id: str, policy: str = "", permissions: dict = {}) -> bool:
-        """Updates a user's policy and/or permissions."""
-        database = self.mongo_client["userdb"]
-        collection = database["users"]
-        
-        user_old_info = collection.find_one({"user_id": user_id})
-        if not user_old_info:
-            raise DocumentNotFoundError(f"User '{user_id}' not found for update.")
-
+    def update_user(self, user_id: str, policy: Optional[str] = None, permissions: Optional[dict] = None) -> bool:
+        """
+        Updates a user's policy and/or permissions.
+        The role transition is computed server-side from the stored document, so the
+        whole update is a single find_one_and_update with an aggregation pipeline.
+        """
         if not permissions and not policy:
             return True # Nothing to update
 
-        updates = {}
+        collection = self._users
+        permissions = permissions or {}
+
+        # Every expression in one $set stage sees the document as it was before the update
+        updates: Dict[str, Any] = {}
         if policy:
-            if policy != user_old_info['role']:
-                updates["role"] = policy
-                if policy == "admin":
-                    updates.update({"user_management": True, "read": "all", "write": "all"})
-                elif user_old_info['role'] == "admin":
-                    updates["user_management"] = False
-        
+            role_changes = {"$ne": ["$role", policy]}
+            updates["role"] = {"$literal": policy}
+            if policy == "admin":
+                updates["user_management"] = {"$cond": [role_changes, True, "$user_management"]}
+                updates["read"] = {"$cond": [role_changes, "all", "$read"]}
+                updates["write"] = {"$cond": [role_changes, "all", "$write"]}
+            else:
+                was_admin = {"$eq": ["$role", "admin"]}
+                updates["user_management"] = {
+                    "$cond": [{"$and": [role_changes, was_admin]}, False, "$user_management"]
+                }
+
+        # Explicit permissions win over the policy defaults above
         if permissions.get("read"):
-            updates["read"] = permissions["read"]
+            updates["read"] = {"$literal": permissions["read"]}
         if permissions.get("write"):
-            updates["write"] = permissions["write"]
+            updates["write"] = {"$literal": permissions["write"]}
 
-        op = {"$set": updates}
         try:
-            result = collection.update_one({"user_id": user_id}, op)
-            if result.matched_count == 0:
+            if not updates:
+                return True # Only empty permission values were given
+
+            result = collection.find_one_and_update({"user_id": user_id}, [{"$set": updates}], {"_id": 1})
+            if result is None:
                 raise DocumentNotFoundError(f"User '{user_id}' not found for update.")
-            return True
         except PyMongoError as e:
             raise DatabaseError(f"Failed to update user: {e}")
 
+        # Drop the whole cached hash, since the role may have changed along with the
+        # permissions; the next login rebuilds it from Mongo. The update is already
+        # committed, so a cache failure is only logged and the hash's TTL bounds it.
+        try:
+            self.redis_client.delete(user_cache_key(user_id))
+        except RedisError as e:
+            print(f"--- Warning: Failed to invalidate cached user '{user_id}' in Redis: {e} ---")
+        return True
+
     def fetch_document(self, db: str, coll: str, query: dict, projection: Optional[Dict[str, int]] = None) -> Dict:
         """Fetches a single document."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        collection = self._coll(db, coll)
         try:
             document = collection.find_one(query, projection)
             if document is None:
@@ -151,8 +305,7 @@ class Mongo:
 
     def count_documents(self, db: str, coll: str, query: dict) -> int:
         """Counts documents matching a query."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        collection = self._coll(db, coll)
         try:
             count = collection.count_documents(query)
             return count
@@ -161,8 +314,9 @@ class Mongo:
 
     def update_document(self, db: str, coll: str, query: dict, op: dict) -> bool:
         """Updates a single document."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        if not op:
+            return True # Nothing to update
+        collection = self._coll(db, coll)
         try:
             result = collection.update_one(query, op)
             if result.matched_count == 0:
@@ -173,8 +327,7 @@ class Mongo:
 
     def insert_document(self, db: str, coll: str, document: dict) -> bool:
         """Inserts a single document."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        collection = self._coll(db, coll)
         try:
             collection.insert_one(document)
             return True
@@ -183,8 +336,7 @@ class Mongo:
 
     def delete_document(self, db: str, coll: str, query: dict) -> bool:
         """Deletes a single document."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        collection = self._coll(db, coll)
         try:
             result = collection.delete_one(query)
             if result.deleted_count == 0:
@@ -193,20 +345,110 @@ class Mongo:
         except PyMongoError as e:
             raise DatabaseError(f"Failed to delete document: {e}")
 
+    def bulk_mixed(self, db: str, coll: str, ops: List[dict]) -> Dict[str, Any]:
+        """
+        Runs a mix of inserts, updates and deletes as one unordered bulk_write.
+        Each op is {"op": "insert_one", "document": ...}, {"op": "update_one" | "update_many",
+        "query": ..., "update": ...} or {"op": "delete_one" | "delete_many", "query": ...}.
+        If some ops fail, the counts of the applied ones are still returned, with the
+        failures under "write_errors" as {"index", "code", "errmsg"}.
+        """
+        models = []
+        for spec in ops:
+            kind = spec.get("op")
+            if kind == "insert_one":
+                models.append(InsertOne(spec["document"]))
+            elif kind == "update_one":
+                models.append(UpdateOne(spec["query"], spec["update"]))
+            elif kind == "update_many":
+                models.append(UpdateMany(spec["query"], spec["update"]))
+            elif kind == "delete_one":
+                models.append(DeleteOne(spec["query"]))
+            elif kind == "delete_many":
+                models.append(DeleteMany(spec["query"]))
+            else:
+                raise ValueError(f"Bulk operation '{kind}' is not supported.")
+
+        collection = self._coll(db, coll)
+        try:
+            result = collection.bulk_write(models, ordered=False)
+            return {
+                "inserted_count": result.inserted_count,
+                "matched_count": result.matched_count,
+                "modified_count": result.modified_count,
+                "deleted_count": result.deleted_count,
+            }
+        except BulkWriteError as e:
+            # Unordered, so the other writes were applied; report them with the failures
+            details = e.details
+            return {
+                "inserted_count": details.get("nInserted", 0),
+                "matched_count": details.get("nMatched", 0),
+                "modified_count": details.get("nModified", 0),
+                "deleted_count": details.get("nRemoved", 0),
+                "write_errors": [
+                    {"index": error["index"], "code": error.get("code", 0), "errmsg": error.get("errmsg", "")}
+                    for error in details.get("writeErrors", [])
+                ],
+            }
+        except PyMongoError as e:
+            raise DatabaseError(f"Failed to bulk write documents: {e}")
+
     def bulk_delete_documents(self, db: str, coll: str, query: dict) -> int:
         """Deletes multiple documents."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        collection = self._coll(db, coll)
         try:
             result = collection.delete_many(query)
             return result.deleted_count
         except PyMongoError as e:
             raise DatabaseError(f"Failed to bulk delete documents: {e}")
 
-    def bulk_fetch_documents(self, db: str, coll: str, query: dict = {}, projection: Optional[Dict[str, int]] = None, sort: Optional[List[Tuple[str, int]]] = None, offset: Optional[int] = None, limit: Optional[int] = None, batch_size: Optional[int] = None) -> List[Dict]:
-        """Fetches multiple documents."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+    def paginated_find(self, db: str, coll: str, query: Optional[dict] = None, projection: Optional[Dict[str, int]] = None, sort: Optional[List[Tuple[str, int]]] = None, offset: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Fetches one page of documents together with the total number of matches,
+        using a single aggregation with $facet instead of a find plus a count.
+        `limit` is required and capped at _MAX_PAGE_SIZE. Pages are ordered by `sort`,
+        with `_id` as the tiebreaker so consecutive pages never overlap.
+        """
+        if not limit:
+            raise ValueError("A limit is required to fetch a page of documents.")
+        query = query or {}
+        collection = self._coll(db, coll)
+        page: List[Dict[str, Any]] = []
+        if offset:
+            page.append({"$skip": offset})
+        page.append({"$limit": min(limit, _MAX_PAGE_SIZE)})
+        if projection:
+            page.append({"$project": projection})
+
+        order = dict(sort or [])
+        order.setdefault("_id", 1)
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": query},
+            {"$sort": order},
+            {"$facet": {"data": page, "total": [{"$count": "n"}]}},
+        ]
+
+        try:
+            result = next(collection.aggregate(pipeline), None) or {}
+            total = result.get("total") or [{"n": 0}]
+            return {"data": result.get("data", []), "total": total[0]["n"]}
+        except OperationFailure as e:
+            if e.code in _FACET_TOO_LARGE_CODES:
+                raise PageTooLargeError()
+            raise DatabaseError(f"Failed to fetch page of documents: {e}")
+        except PyMongoError as e:
+            raise DatabaseError(f"Failed to fetch page of documents: {e}")
+
+    def iter_documents(self, db: str, coll: str, query: Optional[dict] = None, projection: Optional[Dict[str, int]] = None, sort: Optional[List[Tuple[str, int]]] = None, offset: Optional[int] = None, limit: Optional[int] = None, batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Streams the documents matching a query, one at a time and with `_id` as a string
+        (see `_coll`).
+        Only one cursor batch is held in memory, so callers can stream large results.
+        The query only runs, and DatabaseError is only raised, once iteration starts.
+        """
+        query = query or {}
+        collection = self._coll(db, coll)
         try:
             cursor = collection.find(query, projection)
             if sort:
@@ -215,21 +457,17 @@ class Mongo:
                 cursor = cursor.skip(offset)
             if limit:
                 cursor = cursor.limit(limit)
-            if batch_size:
-                cursor = cursor.batch_size(batch_size)
-            
-            ret = [doc for doc in cursor]
-            for doc in ret:
-                if "_id" in doc:
-                    doc["_id"] = str(doc["_id"])
-            return ret
+            cursor = cursor.batch_size(batch_size or _DEFAULT_BATCH_SIZE)
+
+            yield from cursor
         except PyMongoError as e:
             raise DatabaseError(f"Failed to bulk fetch documents: {e}")
 
     def bulk_update_documents(self, db: str, coll: str, query: dict, op: dict) -> int:
         """Updates multiple documents."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        if not op:
+            return 0 # Nothing to update
+        collection = self._coll(db, coll)
         try:
             result = collection.update_many(query, op)
             return result.modified_count
@@ -238,8 +476,7 @@ class Mongo:
 
     def bulk_insert_documents(self, db: str, coll: str, documents: List[dict]) -> int:
         """Inserts multiple documents."""
-        database = self.mongo_client[db]
-        collection = database[coll]
+        collection = self._coll(db, coll)
         try:
             result = collection.insert_many(documents)
             return len(result.inserted_ids)
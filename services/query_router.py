@@ -1,13 +1,79 @@
 """
 Query Routing Module
 """
+from functools import lru_cache
 from fastapi import Request # type: ignore
+import orjson # type: ignore
 from pymongo import MongoClient # type: ignore
 from redis import Redis # type: ignore
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, Callable, FrozenSet, Optional, Tuple
 
 from .exceptions import AuthorizationError, ExplicitDenyError
 from .operations import Mongo
+from .utils import permissions_fingerprint
+
+# Outcomes of an authorization decision
+_ALLOW = 0
+_DENY = 1
+_EXPLICIT_DENY = 2
+_NO_PERMISSIONS = 3
+
+
+def _query_to_documents(request_args: dict) -> dict:
+    """insert_many receives its documents in the 'query' field."""
+    request_args["documents"] = request_args.pop("query", [])
+    return request_args
+
+
+def _fields_to_projection(request_args: dict) -> dict:
+    """
+    Turns a 'fields' list into an inclusion projection, so only the requested
+    fields are sent over the wire and BSON-decoded.
+    """
+    fields = request_args.pop("fields", None)
+    if fields:
+        projection = dict(request_args.get("projection") or {})
+        for field in fields:
+            projection[field] = 1
+        projection.setdefault("_id", 1)
+        request_args["projection"] = projection
+    return request_args
+
+
+@lru_cache(maxsize=1024)
+def _compile_decider(perms_fp: str) -> Callable[[str, str, str], int]:
+    """
+    Specializes the authorization check for one set of permissions, given as their
+    fingerprint. The shape of each grant is resolved here once, so the returned
+    closure is a dict lookup plus, for per-collection grants, a set membership test.
+    """
+    permissions = orjson.loads(perms_fp)
+    if not permissions:
+        return lambda op_type, db, coll: _NO_PERMISSIONS
+
+    # op_type -> (fixed decision, or None to check the granted (db, coll) pairs)
+    rules: Dict[str, Tuple[Optional[int], FrozenSet[Tuple[str, str]]]] = {
+        "user_management": (_ALLOW if permissions.get("user_management") else _DENY, frozenset()),
+    }
+    for op_type in ("read", "write"):
+        allowed = permissions.get(op_type)
+        if allowed == "none":
+            rules[op_type] = (_EXPLICIT_DENY, frozenset())
+        elif allowed == "all":
+            rules[op_type] = (_ALLOW, frozenset())
+        elif isinstance(allowed, dict):
+            granted = frozenset((db, coll) for db, colls in allowed.items() for coll in colls)
+            rules[op_type] = (None, granted)
+        else:
+            rules[op_type] = (_DENY, frozenset())
+
+    def decide(op_type: str, db: str, coll: str) -> int:
+        fixed, granted = rules[op_type]
+        if fixed is not None:
+            return fixed
+        return _ALLOW if (db, coll) in granted else _DENY
+
+    return decide
 
 
 class QueryRouter:
@@ -15,20 +81,36 @@ class QueryRouter:
         self.user_ops = Mongo(mongo_client=userdb_client, redis_client=redis_client)
         self.data_ops = Mongo(mongo_client=data_client, redis_client=redis_client)
         
-        self._user_op_names: List[str] = [
+        self._user_op_names: FrozenSet[str] = frozenset((
             "create_user", "update_user", "delete_user"
-        ]
+        ))
         
-        self._data_op_map: Dict[str, Callable] = {
-            "find_one": self.data_ops.fetch_document,
-            "find": self.data_ops.bulk_fetch_documents,
-            "count_documents": self.data_ops.count_documents,
-            "insert_one": self.data_ops.insert_document,
-            "insert_many": self.data_ops.bulk_insert_documents,
-            "update_one": self.data_ops.update_document,
-            "update_many": self.data_ops.bulk_update_documents,
-            "delete_one": self.data_ops.delete_document,
-            "delete_many": self.data_ops.bulk_delete_documents,
+        # op name -> (bound handler, takes db/coll from the payload, request-args transform)
+        self._dispatch: Dict[str, Tuple[Callable, bool, Optional[Callable[[dict], dict]]]] = {
+            "create_user": (self.user_ops.create_user, False, None),
+            "update_user": (self.user_ops.update_user, False, None),
+            "delete_user": (self.user_ops.delete_user, False, None),
+            "find_one": (self.data_ops.fetch_document, True, _fields_to_projection),
+            "find": (self.data_ops.iter_documents, True, _fields_to_projection),
+            "find_page": (self.data_ops.paginated_find, True, _fields_to_projection),
+            "count_documents": (self.data_ops.count_documents, True, None),
+            "insert_one": (self.data_ops.insert_document, True, None),
+            "insert_many": (self.data_ops.bulk_insert_documents, True, _query_to_documents),
+            "update_one": (self.data_ops.update_document, True, None),
+            "update_many": (self.data_ops.bulk_update_documents, True, None),
+            "delete_one": (self.data_ops.delete_document, True, None),
+            "delete_many": (self.data_ops.bulk_delete_documents, True, None),
+            "bulk_write": (self.data_ops.bulk_mixed, True, None),
+        }
+
+        # Permission category of every operation, inverted once for a single dict lookup per request
+        op_type_map = {
+            "read": ["find_one", "find", "find_page", "count_documents"],
+            "write": ["insert_one", "insert_many", "update_one", "update_many", "delete_one", "delete_many", "bulk_write"],
+            "user_management": self._user_op_names
+        }
+        self._op_type_by_name: Dict[str, str] = {
+            op: op_type for op_type, ops in op_type_map.items() for op in ops
         }
 
     def _validate_auth(self, op_name: str, db: str, coll: str, user_info: dict) -> None:
@@ -36,39 +118,23 @@ class QueryRouter:
         Checks if the operation is authorized for the user based on their token.
         Raises AuthorizationError on failure.
         """
-        op_type_map = {
-            "read": ["find_one", "find", "count_documents"],
-            "write": ["insert_one", "insert_many", "update_one", "update_many", "delete_one", "delete_many"],
-            "user_management": self._user_op_names
-        }
-
-        op_type = None
-        for type, ops in op_type_map.items():
-            if op_name in ops:
-                op_type = type
-                break
-        
+        op_type = self._op_type_by_name.get(op_name)
         if not op_type:
             raise AuthorizationError(f"Operation '{op_name}' is not valid.")
 
-        permissions = user_info.get("permissions")
-        if not permissions:
-            raise AuthorizationError("User has no permissions defined.")
-
-        allowed = permissions.get(op_type)
-        is_authorized = False
-        if op_type == "user_management" and allowed:
-            is_authorized = True
-        elif op_type in ["read", "write"]:
-            if allowed == "none":
-                raise ExplicitDenyError(f"Access for '{op_type}' on '{db}.{coll}' is explicitly denied by policy.")
-            if allowed == "all":
-                is_authorized = True
-            elif isinstance(allowed, dict) and coll in allowed.get(db, []):
-                is_authorized = True
+        # Set when the token is decoded; computed here for user info built elsewhere
+        perms_fp = user_info.get("perms_fp")
+        if perms_fp is None:
+            perms_fp = permissions_fingerprint(user_info.get("permissions") or {})
 
-        if not is_authorized:
-            raise AuthorizationError(f"User not authorized for '{op_type}' on '{db}.{coll}'.")
+        decision = _compile_decider(perms_fp)(op_type, db, coll)
+        if decision == _ALLOW:
+            return
+        if decision == _NO_PERMISSIONS:
+            raise AuthorizationError("User has no permissions defined.")
+        if decision == _EXPLICIT_DENY:
+            raise ExplicitDenyError(f"Access for '{op_type}' on '{db}.{coll}' is explicitly denied by policy.")
+        raise AuthorizationError(f"User not authorized for '{op_type}' on '{db}.{coll}'.")
 
 
     def route_query(self, request: Request, payload: Dict[str, Any]) -> Any:
@@ -88,33 +154,25 @@ class QueryRouter:
         if not user_info:
             raise ValueError("User info must be provided for authorization.")
             
-        request_args = payload.get("request", {})
-        # request_args['auth'] = user_info
+        entry = self._dispatch.get(op_name)
+        if entry is None:
+            raise ValueError(f"Operation '{op_name}' is not supported.")
+        operation_func, takes_db_coll, transform = entry
 
-        # Dispatch to the correct database client
-        if op_name in self._user_op_names:
-            self._validate_auth(op_name=op_name, db="userdb", coll="users", user_info=user_info)
-            
-            operation_func = getattr(self.user_ops, op_name)
-            return operation_func(**request_args)
+        request_args = payload.get("request", {})
 
-        elif op_name in self._data_op_map:
+        if takes_db_coll:
             db = payload.get("db")
             coll = payload.get("coll")
             if not db or not coll:
                 raise ValueError("Database and collection must be specified for data operations.")
-
             self._validate_auth(op_name=op_name, db=db, coll=coll, user_info=user_info)
-            
-            operation_func = self._data_op_map[op_name]
-            
-            request_args['db'] = db
-            request_args['coll'] = coll
-            
-            if op_name == 'insert_many':
-                request_args['documents'] = request_args.pop('query', [])
-
-            return operation_func(**request_args)
-        
+            request_args["db"] = db
+            request_args["coll"] = coll
         else:
-            raise ValueError(f"Operation '{op_name}' is not supported.")
+            # User management always targets userdb.users
+            self._validate_auth(op_name=op_name, db="userdb", coll="users", user_info=user_info)
+
+        if transform is not None:
+            request_args = transform(request_args)
+        return operation_func(**request_args)
@@ -2,11 +2,72 @@
 Helper functions for the services layer
 """
 
+import hashlib
+import hmac
+from typing import List
+
 import bcrypt # type: ignore
+import orjson # type: ignore
+
+from core.config import settings
+
+if not settings.API_KEY_PEPPER:
+    # Fail at startup rather than hashing keys with an empty secret
+    raise RuntimeError("API key pepper is not configured.")
+
+# API keys are 256-bit random tokens, so a keyed SHA-256 is as strong as bcrypt for them
+# at a tiny fraction of the cost. The keyed state is built once and copied per hash.
+_API_KEY_HMAC = hmac.new(settings.API_KEY_PEPPER.encode(), digestmod=hashlib.sha256)
+
+# Hashes issued before HMAC keys are bcrypt's modular crypt strings
+_BCRYPT_PREFIX = "$2"
+
+
+def permissions_fingerprint(permissions: dict) -> str:
+    """
+    Canonical JSON of a permissions mapping. Equal permissions give equal strings,
+    so it serves both as a cache key for authorization decisions and as their input.
+    """
+    return orjson.dumps(permissions, option=orjson.OPT_SORT_KEYS).decode()
+
+
+def user_cache_key(user_id: str) -> str:
+    """
+    Redis key of a user's cached auth hash. The prefix keeps user hashes apart
+    from other keys, so no user_id can collide with e.g. the policy set.
+    """
+    return f"user:{user_id}"
+
+
+# Field of the cached user hash holding the user's permissions as JSON.
+# The hash is deleted whenever the user's role or permissions change.
+CACHED_PERMISSIONS_FIELD = "permissions"
+
+
+def hash_api_key(plain: str) -> bytes:
+    """
+    Hashes an API key with HMAC-SHA256 under the server pepper, as ASCII hex bytes.
+    """
+    mac = _API_KEY_HMAC.copy()
+    mac.update(plain.encode())
+    return mac.hexdigest().encode()
+
+
+def verify_key(plain: str, hashed: str | bytes) -> bool:
+    """
+    Verifies an API key by matching the plaintext string against its hash.
+    The hash may be the raw bytes stored in Mongo or the ASCII str cached in Redis.
+    Legacy bcrypt hashes are still checked with bcrypt.
+    """
+    if isinstance(hashed, bytes):
+        hashed = hashed.decode()
+    if hashed.startswith(_BCRYPT_PREFIX):
+        return bcrypt.checkpw(plain.encode(), hashed.encode())
+    return hmac.compare_digest(hash_api_key(plain).decode(), hashed)
 
 
-def verify_key(plain: str, hashed: bytes) -> bool:
+def hash_keys(plains: List[str]) -> List[bytes]:
     """
-    Verifies a bcrypt key by matching the plaintext string against a hashed byte string.
+    Hashes several API keys, returning the hashes in input order.
     """
-    return bcrypt.checkpw(plain.encode(), hashed)
+    return [hash_api_key(plain) for plain in plains]
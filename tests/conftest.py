@@ -0,0 +1,14 @@
+"""
+Shared test setup: makes the application packages importable and provides the
+settings that `core.config` requires, so services can be imported without a .env.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("USERDB_MONGO_URI", "mongodb://localhost:27017/userdb")
+os.environ.setdefault("DATA_MONGO_URI", "mongodb://localhost:27017/data_db")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SERVER_SECRET", "test-server-secret")
+os.environ.setdefault("API_KEY_PEPPER", "test-api-key-pepper")
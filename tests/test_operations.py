@@ -0,0 +1,128 @@
+"""
+Tests for Mongo.update_user.
+
+The role transition runs server-side as an aggregation-pipeline update, so
+`_apply_set_stage` evaluates the few expressions it uses against a document, and
+the result is compared with `_legacy_update`, the read-then-write logic it replaced.
+"""
+import copy
+from unittest.mock import MagicMock
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError # type: ignore
+
+from services.exceptions import DocumentNotFoundError
+from services.operations import Mongo
+from services.utils import user_cache_key
+
+_MISSING = object()
+
+USERS = [
+    {"user_id": "dev1", "role": "dev", "user_management": False, "read": {"db1": ["c1"]}, "write": "none"},
+    {"user_id": "adm1", "role": "admin", "user_management": True, "read": "all", "write": "all"},
+    {"user_id": "ana1", "role": "analyst", "read": "all"},
+]
+POLICIES = [None, "", "dev", "admin", "analyst"]
+PERMISSIONS = [None, {}, {"read": {"db2": ["c2"]}}, {"write": "all"}, {"read": None, "write": {"db1": ["c1"]}}]
+
+
+def _evaluate(expr, doc):
+    """Evaluates the aggregation expressions update_user emits."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:], _MISSING)
+    if isinstance(expr, dict) and len(expr) == 1:
+        (op, arg), = expr.items()
+        if op == "$literal":
+            return arg
+        if op == "$cond":
+            condition, then, otherwise = arg
+            return _evaluate(then if _evaluate(condition, doc) else otherwise, doc)
+        if op == "$eq":
+            return _evaluate(arg[0], doc) == _evaluate(arg[1], doc)
+        if op == "$ne":
+            return _evaluate(arg[0], doc) != _evaluate(arg[1], doc)
+        if op == "$and":
+            return all(_evaluate(part, doc) for part in arg)
+    return expr
+
+
+def _apply_set_stage(doc, pipeline):
+    """Applies a single-$set pipeline update; a missing value leaves the field unset."""
+    (stage,) = pipeline
+    updated = dict(doc)
+    for field, expr in stage["$set"].items():
+        value = _evaluate(expr, doc)
+        if value is _MISSING:
+            updated.pop(field, None)
+        else:
+            updated[field] = value
+    return updated
+
+
+def _legacy_update(doc, policy, permissions):
+    """update_user as it was before the pipeline update."""
+    permissions = permissions or {}
+    if not permissions and not policy:
+        return dict(doc)
+    updates = {}
+    if policy and policy != doc["role"]:
+        updates["role"] = policy
+        if policy == "admin":
+            updates.update({"user_management": True, "read": "all", "write": "all"})
+        elif doc["role"] == "admin":
+            updates["user_management"] = False
+    if permissions.get("read"):
+        updates["read"] = permissions["read"]
+    if permissions.get("write"):
+        updates["write"] = permissions["write"]
+    return {**doc, **updates}
+
+
+def _mongo():
+    mongo = Mongo(MagicMock(), MagicMock())
+    mongo._users = MagicMock()
+    return mongo
+
+
+@pytest.mark.parametrize("user", USERS, ids=lambda user: user["user_id"])
+@pytest.mark.parametrize("policy", POLICIES)
+@pytest.mark.parametrize("permissions", PERMISSIONS)
+def test_update_matches_legacy_transitions(user, policy, permissions):
+    mongo = _mongo()
+    mongo._users.find_one_and_update.return_value = {"_id": 1}
+
+    assert mongo.update_user(user["user_id"], policy, copy.deepcopy(permissions)) is True
+
+    if mongo._users.find_one_and_update.called:
+        query, pipeline, _ = mongo._users.find_one_and_update.call_args.args
+        assert query == {"user_id": user["user_id"]}
+        result = _apply_set_stage(user, pipeline)
+    else:
+        result = dict(user)
+    assert result == _legacy_update(user, policy, permissions)
+
+
+def test_update_drops_cached_user_hash():
+    mongo = _mongo()
+    mongo._users.find_one_and_update.return_value = {"_id": 1}
+
+    mongo.update_user("dev1", policy="admin")
+
+    mongo.redis_client.delete.assert_called_once_with(user_cache_key("dev1"))
+
+
+def test_update_survives_redis_failure_after_commit():
+    mongo = _mongo()
+    mongo._users.find_one_and_update.return_value = {"_id": 1}
+    mongo.redis_client.delete.side_effect = RedisConnectionError("down")
+
+    assert mongo.update_user("dev1", policy="admin") is True
+
+
+def test_update_unknown_user():
+    mongo = _mongo()
+    mongo._users.find_one_and_update.return_value = None
+
+    with pytest.raises(DocumentNotFoundError):
+        mongo.update_user("ghost", policy="dev")
+    mongo.redis_client.delete.assert_not_called()
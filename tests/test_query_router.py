@@ -0,0 +1,106 @@
+"""
+Tests for QueryRouter authorization.
+
+`_legacy_validate_auth` is the per-request check that `_compile_decider` replaced;
+the compiled decider must reach the same decision for every grant shape.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.exceptions import AuthorizationError, ExplicitDenyError
+from services.query_router import QueryRouter
+from services.utils import permissions_fingerprint
+
+USER_OPS = frozenset(("create_user", "update_user", "delete_user"))
+OP_TYPES = {
+    "read": ["find_one", "find", "find_page", "count_documents"],
+    "write": ["insert_one", "insert_many", "update_one", "update_many", "delete_one", "delete_many", "bulk_write"],
+    "user_management": USER_OPS,
+}
+ALL_OPS = [op for ops in OP_TYPES.values() for op in ops]
+TARGETS = [("db1", "c1"), ("db1", "c2"), ("db2", "c1"), ("userdb", "users")]
+
+PERMISSIONS = [
+    None,
+    {},
+    {"read": "all", "write": "all", "user_management": True},
+    {"read": "none", "write": "none", "user_management": False},
+    {"read": "all", "write": "none"},
+    {"read": {"db1": ["c1", "c2"], "db2": []}, "write": {"db1": ["c1"]}},
+    {"read": {}, "write": "all"},
+    {"read": {"db2": ["c1"]}},
+    {"user_management": True},
+    {"read": "unexpected", "write": ["db1"]},
+]
+
+
+def _legacy_validate_auth(op_name, db, coll, user_info):
+    """The authorization check as it was before `_compile_decider`."""
+    op_type = None
+    for type_, ops in OP_TYPES.items():
+        if op_name in ops:
+            op_type = type_
+            break
+
+    if not op_type:
+        raise AuthorizationError(f"Operation '{op_name}' is not valid.")
+
+    permissions = user_info.get("permissions")
+    if not permissions:
+        raise AuthorizationError("User has no permissions defined.")
+
+    allowed = permissions.get(op_type)
+    is_authorized = False
+    if op_type == "user_management" and allowed:
+        is_authorized = True
+    elif op_type in ["read", "write"]:
+        if allowed == "none":
+            raise ExplicitDenyError(f"Access for '{op_type}' on '{db}.{coll}' is explicitly denied by policy.")
+        if allowed == "all":
+            is_authorized = True
+        elif isinstance(allowed, dict) and coll in allowed.get(db, []):
+            is_authorized = True
+
+    if not is_authorized:
+        raise AuthorizationError(f"User not authorized for '{op_type}' on '{db}.{coll}'.")
+
+
+def _outcome(check, *args):
+    """Returns None when `check` allows, else the type and message of its error."""
+    try:
+        check(*args)
+    except AuthorizationError as e:
+        return type(e), str(e)
+    return None
+
+
+@pytest.fixture
+def router():
+    return QueryRouter(MagicMock(), MagicMock(), MagicMock())
+
+
+@pytest.mark.parametrize("permissions", PERMISSIONS)
+@pytest.mark.parametrize("with_fp", [True, False])
+def test_decider_matches_legacy_check(router, permissions, with_fp):
+    user_info = {"permissions": permissions}
+    if with_fp:
+        user_info["perms_fp"] = permissions_fingerprint(permissions or {})
+
+    for op_name in ALL_OPS:
+        for db, coll in TARGETS:
+            expected = _outcome(_legacy_validate_auth, op_name, db, coll, {"permissions": permissions})
+            actual = _outcome(router._validate_auth, op_name, db, coll, user_info)
+            assert actual == expected, (op_name, db, coll)
+
+
+def test_unknown_operation_is_rejected(router):
+    user_info = {"permissions": {"read": "all", "write": "all", "user_management": True}}
+    with pytest.raises(AuthorizationError, match="is not valid"):
+        router._validate_auth("drop_database", "db1", "c1", user_info)
+
+
+def test_fingerprint_ignores_key_order():
+    a = {"read": {"db1": ["c1"]}, "write": "all"}
+    b = {"write": "all", "read": {"db1": ["c1"]}}
+    assert permissions_fingerprint(a) == permissions_fingerprint(b)
@@ -0,0 +1,45 @@
+"""
+Tests for API key hashing and verification, covering new HMAC hashes and the
+legacy bcrypt hashes of keys issued before them.
+"""
+import bcrypt # type: ignore
+import pytest
+
+from services.utils import hash_api_key, hash_keys, verify_key
+
+API_KEY = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFG"
+
+
+@pytest.fixture(scope="module")
+def bcrypt_hash():
+    # Low cost factor: only the format matters here
+    return bcrypt.hashpw(API_KEY.encode(), bcrypt.gensalt(rounds=4))
+
+
+@pytest.mark.parametrize("as_str", [False, True])
+def test_verify_hmac_hash(as_str):
+    hashed = hash_api_key(API_KEY)
+    if as_str:
+        hashed = hashed.decode()
+    assert verify_key(API_KEY, hashed)
+    assert not verify_key(API_KEY + "x", hashed)
+
+
+@pytest.mark.parametrize("as_str", [False, True])
+def test_verify_legacy_bcrypt_hash(bcrypt_hash, as_str):
+    hashed = bcrypt_hash.decode() if as_str else bcrypt_hash
+    assert verify_key(API_KEY, hashed)
+    assert not verify_key(API_KEY + "x", hashed)
+
+
+def test_hmac_hash_is_ascii_hex_and_not_bcrypt():
+    hashed = hash_api_key(API_KEY)
+    assert len(hashed) == 64
+    int(hashed, 16)
+    assert not hashed.startswith(b"$2")
+
+
+def test_hash_keys_keeps_input_order():
+    keys = ["a", "b", "c"]
+    assert hash_keys(keys) == [hash_api_key(key) for key in keys]
+    assert len(set(hash_keys(keys))) == 3